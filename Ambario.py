@@ -1,17 +1,53 @@
 import pygame
 import cv2
-import numpy as np
 import time
+import argparse
+import os
+import random
+import re
+import subprocess
+import imageio_ffmpeg
 from moviepy import VideoFileClip, AudioFileClip
 from AudioRecorder import AudioRecorder
-from Sprite import Player, Block
+from Sprite import Player
+from CameraCapture import CameraCapture
+from FramePipeline import FrameIngest, FrameExporter
+from VideoEncoder import VideoEncoder
+from StreamingMuxer import StreamingMuxer
+from ProcessPipeline import CaptureProcess, EncoderProcess
+from AudioSource import WavFileSource
+from AudioAnalysis import scream_jump_force
+from TextCache import TextCache
+from Camera import Camera
+from Assets import get_image
+from Level import LevelStreamer, ProceduralLevel
 
 class Game:
     """
     The most important class in the game. This class will handle the game loop, the player, the platforms, and the game logic.
     Since the nature of the loop of the Cv2 and the Pygame is different, we need to make sure that the game loop is running in the Pygame.
+    record_mode: str, default="post" - "post" records output.avi + output.wav and combines them after the game,
+        "stream" sends the frames and the audio to one ffmpeg process so final_output.avi is done when the game exits.
+    pipeline: str, default="thread" - "thread" runs the camera capture and the video encoding on threads,
+        "process" runs them in their own processes and moves the frames through shared memory.
+        The streaming recorder needs the audio thread, so with record_mode="stream" the encoding stays on a thread.
+    audio_source: AudioSource, default=None - Where the audio comes from, None is the microphone.
+        A WavFileSource replays a recorded session, e.g. to benchmark the game on a machine without a microphone.
+    scream_threshold: float, default=500 - The volume a scream needs to make the player jump.
+    scream_gain: float, default=250 - How much volume above the threshold adds one unit of jump force.
+    level: str, default="Levels/level-1" - The folder of the level data files, see Level.py.
+    endless: bool, default=False - Play an endless generated level instead, the run only ends when the player dies.
+    seed: int, default=None - The seed of the endless level, None picks a random one.
+    render_fps: int, default=None - The rate the screen is drawn and recorded at, None is the native rate of the camera
+        (up to 60), or TICK_RATE when the camera doesn't report one.
+        The simulation always runs at TICK_RATE.
+    interpolate: bool, default=True - Draws the frames between two ticks part of the way between them.
     """
-    def __init__(self):
+    TICK_RATE = 15        # Simulation ticks per second, the gameplay speed is tuned for it
+    MAX_FRAME_TIME = 0.25 # Most simulation time caught up on at once, after a stall
+
+    def __init__(self, record_mode="post", pipeline="thread", audio_source=None, scream_threshold=500, scream_gain=250,
+                 level="Levels/level-1", endless=False, seed=None, render_fps=None, interpolate=True):
         pygame.init()
         self.screen = pygame.display.set_mode((640, 480))
         pygame.display.set_caption("Jumping Game with Camera Background")
@@ -23,96 +59,238 @@ class Game:
         self.message_duration = 3  # seconds
         self.score = 0
         self.lives = 3
+        self.scream_threshold = scream_threshold
+        self.scream_gain = scream_gain
+
+        ## Text rendering, fonts and surfaces are cached instead of made every frame
+        self.text_cache = TextCache()
+        self.hud_text = {}
+        self.hud_surfaces = {}
 
-        # Load and resize the platform image
-        self.platform_image = pygame.image.load("Model/ground.png").convert_alpha()
-        self.platform_image = pygame.transform.scale(self.platform_image, (200, 50))  # Resize to (width, height)
+        # Load and resize the platform image, the images come from the shared asset registry
+        self.platform_image = get_image("ground.png", (200, 50))  # Resize to (width, height)
         self.player = pygame.sprite.GroupSingle(Player())
 
         ## Pipe Image
-        self.pipe_image = pygame.image.load("Model/pipe.gif").convert_alpha()
-        self.pipe_image = pygame.transform.scale(self.pipe_image, (120, 400))
+        self.pipe_image = get_image("Pipe.gif", (120, 400))
 
         ## Ocean image  
-        self.ocean = pygame.image.load("Model/ocean-1.png").convert_alpha()
-        self.ocean = pygame.transform.scale(self.ocean, (640, 480))
+        self.ocean = get_image("ocean-1.png", (640, 480))
         self.ocean_rect = self.ocean.get_rect(topleft=(0, 165))
 
         ## Castle Image
-        self.castle_image = pygame.image.load("Model/Castle.png").convert_alpha()
-        self.castle_image = pygame.transform.scale(self.castle_image, (100, 100))
+        self.castle_image = get_image("Castle.png", (100, 100))
 
         ## Video Recorder
-        self.video_cap = cv2.VideoCapture(0)
-        self.fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        self.out = cv2.VideoWriter("output/output.avi", self.fourcc, 15, (640, 480))
-        self.audio_recorder = AudioRecorder()
+        if pipeline == "process":
+            self.video_cap = CaptureProcess(0, self.screen.get_size())
+        else:
+            self.video_cap = CameraCapture(0)
+        self.frame_ingest = FrameIngest(self.screen.get_size())
+
+        ## Draw and record at the rate of the camera when it tells, the video file gets the same rate.
+        ## The capture is started here, the capture process only knows the rate once it opened the camera
+        self.video_cap.start()
+        camera_fps = self.video_cap.fps()
+        self.render_fps = render_fps or (min(60, int(round(camera_fps))) if camera_fps > 0 else self.TICK_RATE)
+        self.interpolate = interpolate
+        self.record_mode = record_mode
+        audio_sink = None
+        if record_mode == "stream":
+            self.muxer = StreamingMuxer("output/final_output.avi", (640, 480), self.render_fps, rate=audio_source.rate if audio_source else 44100)
+            ## ffmpeg takes the frames at a fixed rate, so a dropped frame is written again to keep the video in sync
+            self.out = VideoEncoder(self.muxer, queue_size=4, policy="drop_oldest", repeat_dropped=True)
+            audio_sink = self.muxer.write_audio
+        elif pipeline == "process":
+            self.out = EncoderProcess("output/output.avi", "XVID", self.render_fps, (640, 480), queue_size=4, policy="drop_oldest")
+        else:
+            self.fourcc = cv2.VideoWriter_fourcc(*"XVID")
+            self.out = VideoEncoder(cv2.VideoWriter("output/output.avi", self.fourcc, self.render_fps, (640, 480)), queue_size=4, policy="drop_oldest")
+        self.audio_recorder = AudioRecorder(frames_per_buffer=256, source=audio_source, audio_sink=audio_sink,
+                                            onset_threshold=scream_threshold)
+        self.frame_exporter = FrameExporter(self.screen.get_size())
         
-        ## Bottom Limit for the Platforms is aroudn 400 since we have Wave that will block the view of the platforms
-        self.platform_layouts = [
-            {
-                "platforms": [(100, 350), (400, 300), (700, 250), (1000, 300), (1300, 250), (1700, 175), (1900, 300), (2220, 350)],
-                "blocks": [(450, 300), (780, 250), (1010, 300)]  # Example block positions
-            }
-        ]
-
-        self.platforms = []
-        self.pipes = []
-        for layout in self.platform_layouts:
-            for pos in layout["platforms"]:
-                platform_rect = self.platform_image.get_rect(topleft=pos)
-                self.platforms.append(platform_rect)
-                pipe_rect = self.pipe_image.get_rect(midtop=(pos[0] + platform_rect.width // 2, pos[1] + platform_rect.height))
-                self.pipes.append(pipe_rect)
-
-        self.blocks = pygame.sprite.Group()
-        for layout in self.platform_layouts:
-            for pos in layout["blocks"]:
-                self.blocks.add(Block(pos[0], pos[1]))
-
-        # Place the castle at the end of the last platform
-        last_platform = self.platforms[-1]
-        self.castle_rect = self.castle_image.get_rect(midbottom=(last_platform.left + last_platform.width // 2, last_platform.top + 5))
         self.platform_speed = 5
-
-    def detect_scream(self, volume, threshold=500):
+        ## In the endless mode the camera follows the player, who walks to the right on the screen otherwise
+        ## and would leave the screen and the loaded chunks after a minute or two
+        self.follow_player = endless
+        self.player_anchor_x = self.player.sprite.rect.x
+        self.camera = Camera(*self.screen.get_size())
+
+        ## The level is streamed from its data files in chunks around the camera. The broad phase indexes
+        ## are filled by the streamer, the collisions and the drawing only look at what is near the player or the viewport
+        if endless:
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            print("Endless mode, seed:", self.seed)
+            self.level = ProceduralLevel(self.seed, self.platform_image, self.pipe_image, self.castle_image)
+        else:
+            self.level = LevelStreamer(level, self.platform_image, self.pipe_image, self.castle_image)
+        self.level.update(self.camera.viewport)
+        self.platform_index = self.level.platform_index
+        self.block_index = self.level.block_index
+        self.blocks = self.level.blocks
+
+    def detect_scream(self, volume, threshold=None, gain=None):
         """
         This method will detect the scream based on the volume of the audio. The scream will be detected if the volume is above the threshold.
+        The game passes the smoothed envelope of the AudioRecorder here, the raw volume jitters too much from buffer to buffer.
+        threshold and gain default to the ones the game was started with, ScreamSweep.py helps to pick them for a venue.
         """
-        if volume > threshold:
-            jump_force = min(-5 - (volume - threshold) / 250, -15)
-            return jump_force
-        return 0
+        threshold = self.scream_threshold if threshold is None else threshold
+        gain = self.scream_gain if gain is None else gain
+        return scream_jump_force(volume, threshold, gain)
 
     def overlay_text(self, text, size, color, position):
         """Overlay text on the screen."""
-        font = pygame.font.Font(None, size)
-        text_surface = font.render(text, True, color)
+        text_surface = self.text_cache.render(text, size, color)
         text_rect = text_surface.get_rect(center=position)
         self.screen.blit(text_surface, text_rect)
 
     def update_hud(self, volume = 0):
-        """Update the HUD with the current volume, score, and lives."""
-        font = pygame.font.Font(None, 36)
-        volume_text = font.render(f"Volume: {int(volume)}", True, (255, 255, 255))
-        score_text = font.render(f"Score: {self.score}", True, (255, 255, 255))
-        lives_text = font.render(f"Lives: {self.lives}", True, (255, 255, 255))
-
-        self.screen.blit(volume_text, (10, 10))
-        self.screen.blit(score_text, (10, 50))
-        self.screen.blit(lives_text, (10, 90))
+        """Update the HUD with the current volume, score, and lives. A line is only rendered again when its text changes."""
+        lines = (
+            ("volume", f"Volume: {int(volume)}", (10, 10)),
+            ("score", f"Score: {self.score}", (10, 50)),
+            ("lives", f"Lives: {self.lives}", (10, 90)),
+        )
+        for name, text, position in lines:
+            if self.hud_text.get(name) != text:
+                self.hud_text[name] = text
+                self.hud_surfaces[name] = self.text_cache.render(text, 36, (255, 255, 255))
+            self.screen.blit(self.hud_surfaces[name], position)
 
  
+    def record_frame(self):
+        """Export the current screen into a buffer from the encoder pool and queue it for encoding."""
+        buffer = self.out.acquire()
+        if buffer is not None:
+            self.frame_exporter.export(self.screen, buffer)
+            self.out.submit(buffer)
+
+    def step(self):
+        """
+        One fixed simulation tick of 1 / TICK_RATE seconds: the scream detection, the player, the blocks, the camera,
+        the collisions and the score. It doesn't draw, so the gameplay speed is the same whatever the frame rate is.
+        """
+        audio = self.audio_recorder.snapshot()
+        self.current_volume = audio.volume
+        input_age = time.monotonic() - audio.timestamp
+        self.input_age_total += input_age
+        self.input_age_max = max(self.input_age_max, input_age)
+        self.input_reads += 1
+
+        ## Only fresh audio can start a jump, a stale envelope means the recorder stalled.
+        ## Every onset since the last tick is taken too, a short shout may already be gone from the envelope
+        scream_level = audio.envelope if audio.sample_index != self.last_sample_index else 0
+        self.last_sample_index = audio.sample_index
+        for onset in self.audio_recorder.drain_onsets():
+            scream_level = max(scream_level, onset.level)
+        jump_force = self.detect_scream(scream_level)
+        if jump_force:
+            self.player.sprite.jump(jump_force)
+
+        self.player.update()
+        self.blocks.update()
+
+        ## The level stays in world coordinates, only the camera scrolls.
+        ## The player lives in screen space, so the collisions use a world copy of its rect
+        ## The camera following the player moves it back on the screen as far as it scrolls extra,
+        ## so the world position of the player doesn't change
+        follow = self.player.sprite.rect.x - self.player_anchor_x if self.follow_player else 0
+        self.camera.scroll(self.platform_speed + follow)
+        self.player.sprite.rect.x -= follow
+        self.level.update(self.camera.viewport.union(self.camera.to_world(self.player.sprite.rect)))
+        player_rect = self.camera.to_world(self.player.sprite.rect)
+        self.player.sprite.on_ground = False
+        for platform in self.platform_index.query(player_rect):
+            if player_rect.colliderect(platform):
+                if player_rect.bottom > platform.top and player_rect.top < platform.top:
+                    player_rect.bottom = platform.top
+                    self.player.sprite.on_ground = True
+                    self.player.sprite.gravity = 0
+                elif player_rect.top < platform.bottom and player_rect.bottom > platform.bottom:
+                    player_rect.top = platform.bottom
+                elif player_rect.right > platform.left and player_rect.left < platform.left:
+                    player_rect.right = platform.left
+                elif player_rect.left < platform.right and player_rect.right > platform.right:
+                    player_rect.left = platform.right
+
+        # Check collision with blocks
+        for block in self.block_index.query(player_rect):
+            if player_rect.colliderect(block.rect):
+                print("Collision with block!")
+                if not self.player.sprite.invincible:
+                    self.player.sprite.hit()
+                    self.lives -= 1
+                    if self.lives <= 0:
+                        self.player.sprite.die()
+                        self.show_game_over = True
+                        self.message_start_time = time.time()
+                        self.running = False
+
+        self.player.sprite.rect.topleft = self.camera.to_screen(player_rect).topleft
+
+        # Check if player falls off the screen
+        if player_rect.top > self.screen.get_height():
+            print("Player fell off the screen!")
+            self.player.sprite.die()
+            self.lives -= 1
+            self.show_game_over = True
+            self.message_start_time = time.time()
+            self.running = False
+
+        # Check collision with castle
+        castle_rect = self.level.castle_rect
+        if castle_rect is not None and player_rect.colliderect(castle_rect):
+            print("Congratulations! You've reached the castle!")
+            self.show_congratulations = True
+            self.message_start_time = time.time()
+            self.running = False
+
+        # Update the score based on distance traveled
+        self.score += 1
+
+    def draw(self, alpha=1.0):
+        """
+        Draws the player and the level alpha of the way from the tick before to the last one, so the motion stays
+        smooth when there are more frames than ticks. alpha=1.0 draws the last tick as it is.
+        """
+        offset = self.camera.render_offset(alpha)
+        viewport = self.camera.render_viewport(alpha)
+        previous_x, previous_y = self.previous_player
+        rect = self.player.sprite.rect
+        self.screen.blit(self.player.sprite.image, (round(previous_x + (rect.x - previous_x) * alpha),
+                                                    round(previous_y + (rect.y - previous_y) * alpha)))
+
+        ## The platforms, pipes and the castle are pre drawn in one strip per chunk
+        for strip, strip_rect in self.level.strips(viewport):
+            self.screen.blit(strip, self.camera.to_screen(strip_rect, offset), special_flags=pygame.BLEND_PREMULTIPLIED)
+        for block in self.block_index.query(viewport):
+            self.screen.blit(block.image, self.camera.to_screen(block.rect, offset))
+
+        # Draw the ocean
+        self.screen.blit(self.ocean, self.ocean_rect)
+
     def run(self):
         """
         Important method to run the game. This method will handle the game loop, the player, the platforms, and the game logic. 
         The way we can draw the pygame screen is by using the cv2 to capture the frame from the camera and then convert it to the pygame surface.
         The game loop will run until the game is over. The game is over when the player reaches the castle or when the player falls off the screen.
+        The simulation runs in fixed ticks of 1 / TICK_RATE seconds, as many as the time since the last frame holds,
+        while the frames are drawn and recorded at render_fps.
         """
         self.audio_recorder.start()
+        self.out.start()
         countdown_seconds = 3
         countdown_start_time = time.time()
-        current_volume = 0  # Initialize current_volume
+        self.current_volume = 0  # Initialize current_volume
+        self.last_sample_index = 0
+        self.input_age_total = 0
+        self.input_age_max = 0
+        self.input_reads = 0
+        tick_seconds = 1 / self.TICK_RATE
+        accumulator = 0
+        self.previous_player = self.player.sprite.rect.topleft
 
         while self.running:
             current_time = time.time()
@@ -122,95 +300,24 @@ class Game:
                 if event.type == pygame.QUIT:
                     self.running = False
 
+            ## Shouts during the countdown are thrown away, they must not make the player jump on the first tick
+            if elapsed_time < countdown_seconds:
+                self.audio_recorder.drain_onsets()
+            else:
+                ## The simulation runs on time whether or not the camera has a frame to draw on
+                while accumulator >= tick_seconds and self.running:
+                    self.previous_player = self.player.sprite.rect.topleft
+                    self.step()
+                    accumulator -= tick_seconds
+
             ret, frame = self.video_cap.read()
             if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = np.rot90(frame)
-                self.screen.fill([0, 0, 0])
-                frame_surface = pygame.surfarray.make_surface(frame)
-                self.screen.blit(frame_surface, (0, 0))
+                self.screen.blit(self.frame_ingest.ingest(frame), (0, 0))
 
                 if elapsed_time < countdown_seconds:
                     self.overlay_text(str(countdown_seconds - int(elapsed_time)), 74, (255, 255, 255), (320, 240))
                 else:
-                    current_volume = self.audio_recorder.volume
-                    jump_force = self.detect_scream(current_volume)
-                    if jump_force:
-                        self.player.sprite.jump(jump_force)
-
-                    self.player.update()
-                    self.blocks.update()
-
-                    for platform in self.platforms:
-                        platform.x -= self.platform_speed
-
-                    for pipe in self.pipes:
-                        pipe.x -= self.platform_speed
-
-                    for block in self.blocks:
-                        block.rect.x -= self.platform_speed
-
-                    self.castle_rect.x -= self.platform_speed
-
-                    player_rect = self.player.sprite.rect
-                    self.player.sprite.on_ground = False
-                    for platform in self.platforms:
-                        if player_rect.colliderect(platform):
-                            if player_rect.bottom > platform.top and player_rect.top < platform.top:
-                                player_rect.bottom = platform.top
-                                self.player.sprite.on_ground = True
-                                self.player.sprite.gravity = 0
-                            elif player_rect.top < platform.bottom and player_rect.bottom > platform.bottom:
-                                player_rect.top = platform.bottom
-                            elif player_rect.right > platform.left and player_rect.left < platform.left:
-                                player_rect.right = platform.left
-                            elif player_rect.left < platform.right and player_rect.right > platform.right:
-                                player_rect.left = platform.right
-
-                    # Check collision with blocks
-                    for block in self.blocks:
-                        if player_rect.colliderect(block.rect):
-                            print("Collision with block!")
-                            if not self.player.sprite.invincible:
-                                self.player.sprite.hit()
-                                self.lives -= 1
-                                if self.lives <= 0:
-                                    self.player.sprite.die()
-                                    self.show_game_over = True
-                                    self.message_start_time = time.time()
-                                    self.running = False
-
-                    # Check if player falls off the screen
-                    if player_rect.top > self.screen.get_height():
-                        print("Player fell off the screen!")
-                        self.player.sprite.die()
-                        self.lives -= 1
-                        self.show_game_over = True
-                        self.message_start_time = time.time()
-                        self.running = False
-
-                    self.player.draw(self.screen)
-                    for platform in self.platforms:
-                        self.screen.blit(self.platform_image, platform)
-                    for pipe in self.pipes:
-                        self.screen.blit(self.pipe_image, pipe)
-                    self.blocks.draw(self.screen)
-
-                    # Draw the castle
-                    self.screen.blit(self.castle_image, self.castle_rect)
-
-                    # Draw the ocean
-                    self.screen.blit(self.ocean, self.ocean_rect)
-
-                    # Check collision with castle
-                    if player_rect.colliderect(self.castle_rect):
-                        print("Congratulations! You've reached the castle!")
-                        self.show_congratulations = True
-                        self.message_start_time = time.time()
-                        self.running = False
-
-                    # Update the score based on distance traveled
-                    self.score += 1
+                    self.draw(accumulator / tick_seconds if self.interpolate and self.running else 1.0)
 
                 if self.show_congratulations:
                     self.overlay_text("Congratulations!", 74, (255, 255, 255), (320, 240))
@@ -223,16 +330,17 @@ class Game:
                         self.show_game_over = False
 
                 # Update the HUD
-                self.update_hud(current_volume)
+                self.update_hud(self.current_volume)
 
                 pygame.display.update()
 
-                frame_for_video = np.array(pygame.surfarray.pixels3d(self.screen))
-                frame_for_video = np.transpose(frame_for_video, (1, 0, 2))
-                frame_for_video = cv2.cvtColor(frame_for_video, cv2.COLOR_RGB2BGR)
-                self.out.write(frame_for_video)
+                self.record_frame()
 
-                self.clock.tick(15)
+            ## Tick even when the camera has no frame yet, so the loop doesn't spin.
+            ## The time owed to the simulation is kept under MAX_FRAME_TIME, so a stall is never caught up all at once
+            frame_time = self.clock.tick(self.render_fps) / 1000
+            if elapsed_time >= countdown_seconds:
+                accumulator = min(accumulator + frame_time, self.MAX_FRAME_TIME)
 
         # Ensure the final message is displayed for the specified duration
         end_time = time.time()
@@ -242,29 +350,102 @@ class Game:
             if self.show_game_over:
                 self.overlay_text("Game Over", 74, (255, 0, 0), (320, 240))
             pygame.display.update()
-            frame_for_video = np.array(pygame.surfarray.pixels3d(self.screen))
-            frame_for_video = np.transpose(frame_for_video, (1, 0, 2))
-            frame_for_video = cv2.cvtColor(frame_for_video, cv2.COLOR_RGB2BGR)
-            self.out.write(frame_for_video)
-            self.clock.tick(15)
+            self.record_frame()
+            self.clock.tick(self.render_fps)
 
         self.audio_recorder.stop()
         self.audio_recorder.save()
-        self.video_cap.release()
+        if self.record_mode == "stream":
+            self.muxer.end_audio()
+        self.video_cap.stop()
         self.out.release()
+        print("Camera frames:", self.video_cap.stats())
+        print("Encoder frames:", self.out.stats())
+        if self.input_reads:
+            print(f"Audio input age: avg {self.input_age_total / self.input_reads * 1000:.1f} ms, "
+                  f"max {self.input_age_max * 1000:.1f} ms")
 
-        # Combine audio and video
-        combine_audio_video("output/output.avi", "output/output.wav", "output/final_output.avi")
+        # Combine audio and video, the streaming mode already wrote the final file
+        if self.record_mode != "stream":
+            combine_audio_video("output/output.avi", "output/output.wav", "output/final_output.avi")
 
         pygame.quit()  
 
-def combine_audio_video(video_path, audio_path, output_path):
+## Video codecs each output container can hold as is, and the audio codec used when remuxing into it
+REMUX_VIDEO_CODECS = {
+    ".avi": {"mpeg4", "h264", "mjpeg", "rawvideo"},
+    ".mkv": {"mpeg4", "h264", "hevc", "mjpeg", "vp8", "vp9", "av1", "rawvideo"},
+    ".mov": {"mpeg4", "h264", "hevc", "mjpeg"},
+    ".mp4": {"mpeg4", "h264", "hevc", "av1"},
+}
+REMUX_AUDIO_CODECS = {".avi": "copy", ".mkv": "copy", ".mov": "copy", ".mp4": "aac"}
+
+## ffmpeg encoder names mapped to the codec they produce, so codec="libx264" matches an h264 source
+ENCODER_CODECS = {"libx264": "h264", "libx265": "hevc", "libxvid": "mpeg4", "libvpx": "vp8", "libvpx-vp9": "vp9"}
+
+def probe_video_codec(video_path):
+    """Return the codec name of the first video stream in the file, or None if ffmpeg can't tell."""
+    result = subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-i", video_path],
+                            capture_output=True, text=True)
+    match = re.search(r"Stream #\d+:\d+.*?: Video: (\w+)", result.stderr)
+    return match.group(1) if match else None
+
+def combine_audio_video(video_path, audio_path, output_path, codec=None, audio_codec=None):
+    """
+    Combine the recorded video and the WAV into the output file.
+    When the output container can hold the recorded video track and the requested codec (if any) is the same
+    codec, the video is stream copied with ffmpeg, which takes seconds. Otherwise it is re-encoded with moviepy.
+    codec: str, default=None - The video encoder for the output. None or "copy" keeps the recorded codec when possible.
+    audio_codec: str, default=None - The audio encoder for the output. None picks one that fits the container.
+    """
+    container = os.path.splitext(output_path)[1].lower()
+    source_codec = probe_video_codec(video_path)
+    wanted_codec = ENCODER_CODECS.get(codec, codec)
+    can_remux = source_codec in REMUX_VIDEO_CODECS.get(container, ())
+
+    if can_remux and wanted_codec in (None, "copy", source_codec):
+        subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+                        "-i", video_path, "-i", audio_path,
+                        "-map", "0:v:0", "-map", "1:a:0",
+                        "-c:v", "copy", "-c:a", audio_codec or REMUX_AUDIO_CODECS[container],
+                        output_path], check=True)
+        return
+
     video = VideoFileClip(video_path)
     audio = AudioFileClip(audio_path)
     final_video = video.with_audio(audio)
-    final_video.write_videofile(output_path, codec="libx264", audio_codec="aac")
+    final_video.write_videofile(output_path, codec=codec if codec not in (None, "copy") else "libx264",
+                                audio_codec=audio_codec or "aac")
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Ambario, the scream controlled platformer.")
+    parser.add_argument("--record-mode", choices=["post", "stream"], default="post",
+                        help="post: combine audio and video after the game, stream: mux them live with ffmpeg")
+    parser.add_argument("--pipeline", choices=["thread", "process"], default="thread",
+                        help="thread: capture and encode on threads, process: in their own processes over shared memory")
+    parser.add_argument("--replay-audio", metavar="WAV",
+                        help="replay a recorded WAV instead of listening to the microphone")
+    parser.add_argument("--replay-fast", action="store_true",
+                        help="replay the WAV as fast as possible instead of at its real pace")
+    parser.add_argument("--scream-threshold", type=float, default=500,
+                        help="volume a scream needs to make the player jump")
+    parser.add_argument("--scream-gain", type=float, default=250,
+                        help="volume above the threshold per unit of jump force")
+    parser.add_argument("--level", default="Levels/level-1", help="folder of the level to play")
+    parser.add_argument("--endless", action="store_true", help="play an endless generated level")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the endless level")
+    parser.add_argument("--render-fps", type=int, default=None,
+                        help="frames drawn and recorded per second, default is the rate of the camera")
+    parser.add_argument("--no-interpolate", action="store_true",
+                        help="draw the last simulation tick as it is instead of between the last two")
+    args = parser.parse_args()
+
+    audio_source = None
+    if args.replay_audio:
+        audio_source = WavFileSource(args.replay_audio, 256, realtime=not args.replay_fast)
+
+    game = Game(record_mode=args.record_mode, pipeline=args.pipeline, audio_source=audio_source,
+                scream_threshold=args.scream_threshold, scream_gain=args.scream_gain, level=args.level,
+                endless=args.endless, seed=args.seed, render_fps=args.render_fps, interpolate=not args.no_interpolate)
     game.run()
     
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import os
+import struct
+import pygame
+from Atlas import TextureAtlas
+
+class AssetRegistry:
+    """
+    Process wide store of the images in Model/. Every file is loaded, converted and scaled once, after that every
+    sprite gets the same shared Surface, so spawning a block or restarting the game does no disk I/O or decoding.
+    The surfaces are shared: draw them, but don't draw on them.
+    When the folder has a texture atlas (see Atlas.py) the sprites in it are served as subsurfaces of the atlas,
+    as long as their source file still has the hash it was packed with. The other images, and the ones changed since
+    the atlas was built, are loaded from their own files.
+    The other images are decoded and scaled once per version of the file: the result is kept as raw pixels in
+    cache_dir, named after the hash of the file contents, so a changed image is decoded again on its own.
+    root: str, default="Model" - The folder of the images.
+    atlas: str, default="atlas.json" - The atlas index in the root folder, None to load every image from its file.
+    cache_dir: str, default=".cache/assets" - The folder of the raw pixel cache, None to decode on every run.
+    """
+    def __init__(self, root="Model", atlas="atlas.json", cache_dir=os.path.join(".cache", "assets")):
+        self.root = root
+        self.atlas_name = atlas
+        self.cache_dir = cache_dir
+        self.atlas = None
+        self.images = {}
+
+    def load_atlas(self):
+        """
+        Returns the texture atlas, loaded on the first call. None when there is no atlas.
+        """
+        if self.atlas is None and self.atlas_name is not None:
+            path = os.path.join(self.root, self.atlas_name)
+            self.atlas = TextureAtlas(path) if os.path.exists(path) else False
+        return self.atlas or None
+
+    def image(self, name, size=None, alpha=True):
+        """
+        Returns the image name from the root folder, converted for the display and scaled to size if given.
+        The display must be set up before the first call.
+        """
+        key = (name, size, alpha)
+        image = self.images.get(key)
+        if image is None:
+            atlas = self.load_atlas()
+            if atlas is not None and key[:2] in atlas and alpha and atlas.source_hash(name, size) == self.file_hash(name):
+                image = atlas.sprite(name, size)
+            else:
+                image = self.load(name, size, alpha)
+            self.images[key] = image
+        return image
+
+    def file_hash(self, name):
+        """
+        Returns the SHA-1 of the image file name, the same hash the atlas and the raw pixel cache are keyed with.
+        """
+        with open(os.path.join(self.root, name), "rb") as image_file:
+            return hashlib.sha1(image_file.read()).hexdigest()
+
+    def load(self, name, size=None, alpha=True):
+        """
+        Loads an image from its file, through the raw pixel cache when there is one.
+        A cache file is the width and height as two 32 bit integers followed by the RGBA (or RGB) pixels.
+        """
+        with open(os.path.join(self.root, name), "rb") as image_file:
+            data = image_file.read()
+        mode = "RGBA" if alpha else "RGB"
+        cache_path = None
+        if self.cache_dir is not None:
+            digest = hashlib.sha1(data).hexdigest()
+            scale = f"{size[0]}x{size[1]}" if size is not None else "full"
+            cache_path = os.path.join(self.cache_dir, f"{digest}-{scale}-{mode}.raw")
+            try:
+                with open(cache_path, "rb") as cache_file:
+                    raw = cache_file.read()
+                width, height = struct.unpack("<II", raw[:8])
+                image = pygame.image.frombytes(raw[8:], (width, height), mode)
+                return image.convert_alpha() if alpha else image.convert()
+            except (OSError, ValueError, struct.error):
+                pass  # Not cached yet, or a broken file that is written again
+
+        image = pygame.image.load(io.BytesIO(data), name)
+        image = image.convert_alpha() if alpha else image.convert()
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        if cache_path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(cache_path + ".tmp", "wb") as cache_file:
+                    cache_file.write(struct.pack("<II", *image.get_size()))
+                    cache_file.write(pygame.image.tobytes(image, mode))
+                os.replace(cache_path + ".tmp", cache_path)
+            except OSError:
+                pass  # A read only install still runs, it decodes on every start
+        return image
+
+    def clear(self):
+        """
+        Forgets every image and the atlas, e.g. after the display was set up again with another pixel format.
+        """
+        self.images.clear()
+        self.atlas = None
+
+registry = AssetRegistry()
+
+def get_image(name, size=None, alpha=True):
+    """
+    Shortcut for registry.image, the image name from Model/ shared by the whole game.
+    """
+    return registry.image(name, size, alpha)
@@ -0,0 +1,125 @@
+"""
+Texture atlas of the game sprites. The build step packs the Mario walk and jump frames, the piranha frames, the
+ground, the pipe and the castle into one image, already scaled to the size the game draws them at, with a JSON index
+of where every sprite is. At runtime the atlas is decoded once and every sprite is a subsurface of it.
+
+atlas.json - {"image": "atlas.png", "sprites": [{"name": "Pipe.gif", "size": [120, 400], "rect": [x, y, w, h],
+                                                  "sha1": "..."}, ...]}
+"size" is the size the sprite was scaled to, null when it keeps its own size, the same arguments as AssetRegistry.image.
+"sha1" is the hash of the source file the sprite was packed from. AssetRegistry checks it and loads a changed image
+from its own file until the atlas is built again, so an edited image never shows the old pixels.
+
+The atlas is not rebuilt on its own: run it again after changing one of the images in Model/ or their size in Game.
+Usage: python Atlas.py [--folder Model] [--width 512]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import pygame
+
+## The sprites in the atlas, (name, size) as the game asks for them, see Player, Block and Game.__init__
+ATLAS_SPRITES = [
+    ("Mario - Walk1.gif", None),
+    ("Mario - Walk2.gif", None),
+    ("Mario - Walk3.gif", None),
+    ("Mario - Jump.gif", None),
+    ("piranha_frame_1.png", None),
+    ("piranha_frame_2.png", None),
+    ("ground.png", (200, 50)),
+    ("Pipe.gif", (120, 400)),
+    ("Castle.png", (100, 100)),
+]
+
+class TextureAtlas:
+    """
+    Class to serve sprites from a packed atlas, the atlas image is loaded and converted once and every sprite is
+    a subsurface of it, so they share one block of pixels.
+    path: str - The atlas.json index, the image is next to it.
+    """
+    def __init__(self, path):
+        with open(path) as index:
+            data = json.load(index)
+        self.image = pygame.image.load(os.path.join(os.path.dirname(path), data["image"])).convert_alpha()
+        self.rects = {}
+        self.hashes = {}
+        for sprite in data["sprites"]:
+            size = tuple(sprite["size"]) if sprite["size"] is not None else None
+            self.rects[(sprite["name"], size)] = pygame.Rect(sprite["rect"])
+            self.hashes[(sprite["name"], size)] = sprite.get("sha1")
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def source_hash(self, name, size=None):
+        """
+        Returns the SHA-1 of the source file the sprite was packed from, None for an atlas built without hashes.
+        """
+        return self.hashes.get((name, size))
+
+    def sprite(self, name, size=None):
+        """
+        Returns the sprite name scaled to size as a subsurface of the atlas.
+        """
+        return self.image.subsurface(self.rects[(name, size)])
+
+def pack(sizes, width, padding=1):
+    """
+    Shelf packing: places the rects from tall to short in rows of at most width pixels.
+    Returns the positions in the order of sizes and the height of the atlas.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i][1], reverse=True)
+    positions = [None] * len(sizes)
+    x = y = shelf_height = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width and x > 0:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+    return positions, y + shelf_height
+
+def build_atlas(folder="Model", sprites=ATLAS_SPRITES, width=512, image_name="atlas.png", index_name="atlas.json"):
+    """
+    Packs the sprites from folder into folder/image_name and writes the index to folder/index_name.
+    No display is needed, the sprites are kept as 32 bit with alpha, the format convert_alpha gives them in the game.
+    """
+    surfaces = []
+    hashes = []
+    for name, size in sprites:
+        with open(os.path.join(folder, name), "rb") as image_file:
+            data = image_file.read()
+        hashes.append(hashlib.sha1(data).hexdigest())
+        source = pygame.image.load(io.BytesIO(data), name)
+        surface = pygame.Surface(source.get_size(), pygame.SRCALPHA, 32)
+        surface.blit(source, (0, 0))
+        if size is not None:
+            surface = pygame.transform.scale(surface, size)
+        surfaces.append(surface)
+
+    positions, height = pack([surface.get_size() for surface in surfaces], width)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    index = {"image": image_name, "sprites": []}
+    for (name, size), surface, position, digest in zip(sprites, surfaces, positions, hashes):
+        atlas.blit(surface, position)
+        index["sprites"].append({"name": name, "size": list(size) if size is not None else None,
+                                 "rect": [*position, *surface.get_size()], "sha1": digest})
+
+    pygame.image.save(atlas, os.path.join(folder, image_name))
+    with open(os.path.join(folder, index_name), "w") as index_file:
+        json.dump(index, index_file, indent=1)
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the game sprites into a texture atlas.")
+    parser.add_argument("--folder", default="Model", help="folder of the images, the atlas is written there too")
+    parser.add_argument("--width", type=int, default=512, help="width of the atlas image")
+    args = parser.parse_args()
+
+    index = build_atlas(args.folder, width=args.width)
+    print(f"Packed {len(index['sprites'])} sprites into {os.path.join(args.folder, index['image'])}")
+
+if __name__ == "__main__":
+    main()
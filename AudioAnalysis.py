@@ -0,0 +1,179 @@
+import collections
+import math
+import numpy as np
+
+Loudness = collections.namedtuple("Loudness", ["rms", "peak", "envelope", "noise_floor"])
+
+def scream_jump_force(volume, threshold=500, gain=250):
+    """
+    Maps the volume of a scream to the jump force of the player, 0 when the volume is under the threshold.
+    It lives here and not in Game, so tools like ScreamSweep can use it without starting pygame.
+    The arguments can be numpy arrays as well, they are broadcast, e.g. for a whole grid of thresholds and gains.
+    A float is returned when they are all plain numbers.
+    """
+    force = np.where(np.greater(volume, threshold), np.minimum(-5 - np.subtract(volume, threshold) / gain, -15), 0.0)
+    return force.item() if force.ndim == 0 else force
+
+class LoudnessAnalyzer:
+    """
+    Class to measure the loudness of every recorded buffer.
+    The int16 samples are converted once into a preallocated float32 scratch buffer, the RMS and the peak are
+    reduced from it without temporaries. On top of that it keeps an attack / release envelope, which is a smoothed
+    volume that rises fast and falls slow, and an adaptive noise floor that follows the quiet parts of the room.
+    rate: int, default=44100 - The sampling rate of the audio.
+    max_samples: int, default=4096 - The largest buffer that will be analyzed, it can grow if a bigger one comes.
+    attack_time: float, default=0.01 - Seconds for the envelope to follow a rising volume.
+    release_time: float, default=0.1 - Seconds for the envelope to follow a falling volume.
+    floor_rise_time: float, default=5.0 - Seconds for the noise floor to follow a louder room.
+    floor_fall_time: float, default=0.5 - Seconds for the noise floor to follow a quieter room.
+    """
+    def __init__(self, rate=44100, max_samples=4096, attack_time=0.01, release_time=0.1,
+                 floor_rise_time=5.0, floor_fall_time=0.5):
+        self.rate = rate
+        self.attack_time = attack_time
+        self.release_time = release_time
+        self.floor_rise_time = floor_rise_time
+        self.floor_fall_time = floor_fall_time
+        self.scratch = np.empty(max_samples, dtype=np.float32)
+
+        self.rms = 0.0
+        self.peak = 0.0
+        self.envelope = 0.0
+        self.noise_floor = None
+
+    @staticmethod
+    def smoothing(duration, time_constant):
+        """
+        Returns the one-pole smoothing coefficient for a buffer of the given duration.
+        """
+        if time_constant <= 0:
+            return 1.0
+        return 1.0 - math.exp(-duration / time_constant)
+
+    def analyze(self, samples):
+        """
+        Analyzes one buffer of int16 samples and returns a Loudness(rms, peak, envelope, noise_floor).
+        """
+        count = len(samples)
+        if count == 0:
+            return Loudness(self.rms, self.peak, self.envelope, self.noise_floor or 0.0)
+        if count > len(self.scratch):
+            self.scratch = np.empty(count, dtype=np.float32)
+
+        scratch = self.scratch[:count]
+        np.copyto(scratch, samples, casting="unsafe")
+        self.rms = math.sqrt(float(np.dot(scratch, scratch)) / count)
+        np.abs(scratch, out=scratch)
+        self.peak = float(scratch.max())
+
+        duration = count / self.rate
+        time_constant = self.attack_time if self.rms > self.envelope else self.release_time
+        self.envelope += (self.rms - self.envelope) * self.smoothing(duration, time_constant)
+
+        if self.noise_floor is None:
+            self.noise_floor = self.rms
+        else:
+            time_constant = self.floor_rise_time if self.rms > self.noise_floor else self.floor_fall_time
+            self.noise_floor += (self.rms - self.noise_floor) * self.smoothing(duration, time_constant)
+
+        return Loudness(self.rms, self.peak, self.envelope, self.noise_floor)
+
+Onset = collections.namedtuple("Onset", ["timestamp", "sample_index", "level"])
+
+## Immutable view of the recorder state, published as a whole so the fields always belong together
+AudioSnapshot = collections.namedtuple("AudioSnapshot", ["volume", "envelope", "sample_index", "timestamp", "onset_count"])
+
+class OnsetDetector:
+    """
+    Class to catch the start of a scream with a short delay.
+    The RMS is measured over a window that slides forward every hop samples, so a shout is seen a hop after it
+    starts instead of a whole buffer later. Every crossing of the threshold is latched as an Onset with its
+    monotonic timestamp, the game takes all of them with drain() and can't miss a short shout between two ticks.
+    rate: int, default=44100 - The sampling rate of the audio.
+    window: int, default=1024 - The number of samples the RMS is measured over, a multiple of hop.
+    hop: int, default=256 - The number of samples between two measurements. Smaller is faster but costs more CPU.
+    threshold: float, default=500 - The RMS that starts an onset, the same scale as Game.detect_scream.
+    release_ratio: float, default=0.5 - The RMS has to fall under threshold * release_ratio before the next onset.
+    min_gap: float, default=0.1 - The minimum number of seconds between two onsets.
+    """
+    def __init__(self, rate=44100, window=1024, hop=256, threshold=500, release_ratio=0.5, min_gap=0.1):
+        if window % hop:
+            raise ValueError("The onset window must be a multiple of the hop size")
+        self.rate = rate
+        self.window = window
+        self.hop = hop
+        self.threshold = threshold
+        self.release_ratio = release_ratio
+        self.min_gap_samples = int(min_gap * rate)
+
+        ## Energy of every hop inside the window, the window energy is their running sum
+        self.hop_energy = np.zeros(window // hop, dtype=np.float64)
+        self.window_energy = 0.0
+        self.hop_count = 0
+        self.scratch = np.empty(hop, dtype=np.float32)
+        self.pending = np.empty(hop, dtype=np.int16)  # Samples left over from the last buffer
+        self.pending_count = 0
+
+        self.sample_index = 0
+        self.last_onset_index = -self.min_gap_samples
+        self.active = False
+        self.level = 0.0
+        self.onset_count = 0
+        self.onsets = collections.deque(maxlen=64)
+
+    def feed(self, samples, timestamp):
+        """
+        Feeds one buffer of int16 samples. timestamp is the time.monotonic() of the last sample of the buffer.
+        """
+        start = 0
+        count = len(samples)
+        if self.pending_count:
+            take = min(self.hop - self.pending_count, count)
+            self.pending[self.pending_count:self.pending_count + take] = samples[:take]
+            self.pending_count += take
+            start = take
+            if self.pending_count == self.hop:
+                self.step(self.pending, timestamp - (count - start) / self.rate)
+                self.pending_count = 0
+
+        while count - start >= self.hop:
+            self.step(samples[start:start + self.hop], timestamp - (count - start - self.hop) / self.rate)
+            start += self.hop
+
+        left = count - start
+        if left:
+            self.pending[:left] = samples[start:]
+            self.pending_count = left
+
+    def step(self, hop_samples, timestamp):
+        """
+        Slides the window by one hop and latches an onset when the window RMS crosses the threshold.
+        """
+        np.copyto(self.scratch, hop_samples, casting="unsafe")
+        energy = float(np.dot(self.scratch, self.scratch))
+        slot = self.hop_count % len(self.hop_energy)
+        self.window_energy += energy - self.hop_energy[slot]
+        self.hop_energy[slot] = energy
+        self.hop_count += 1
+        self.sample_index += self.hop
+        if slot == len(self.hop_energy) - 1:
+            self.window_energy = float(self.hop_energy.sum())  # Don't let the running sum drift
+
+        self.level = math.sqrt(max(self.window_energy, 0.0) / self.window)
+        if self.active:
+            if self.level < self.threshold * self.release_ratio:
+                self.active = False
+        elif self.level > self.threshold and self.sample_index - self.last_onset_index >= self.min_gap_samples:
+            self.active = True
+            self.last_onset_index = self.sample_index
+            self.onset_count += 1
+            self.onsets.append(Onset(timestamp, self.sample_index, self.level))
+
+    def drain(self):
+        """
+        Returns the onsets latched since the last call, oldest first.
+        """
+        onsets = []
+        while self.onsets:
+            onsets.append(self.onsets.popleft())
+        return onsets
@@ -0,0 +1,98 @@
+import tempfile
+import os
+import numpy as np
+
+class PCMArena:
+    """
+    Chunked int16 store for the recorded PCM, replacing the list of bytes objects.
+    Samples are copied into preallocated chunks. A new chunk is only added when the current one is full, and
+    full chunks are recycled, so a long session doesn't create a new object for every buffer.
+    chunk_samples: int, default=441000 - The number of samples per chunk, 10 seconds at 44.1 kHz.
+    memory_cap: int, default=64 * 1024 * 1024 - The maximum number of bytes kept in memory.
+    spill_policy: str, default="spill" - What to do when the cap is reached:
+        "spill" writes the oldest full chunk to a temporary file on disk, "drop_oldest" forgets the oldest
+        full chunk (keeps only the latest audio), "drop_newest" stops storing new samples.
+    """
+    POLICIES = ("spill", "drop_oldest", "drop_newest")
+
+    def __init__(self, chunk_samples=441000, memory_cap=64 * 1024 * 1024, spill_policy="spill"):
+        if spill_policy not in self.POLICIES:
+            raise ValueError(f"Unknown spill policy: {spill_policy}")
+        self.chunk_samples = chunk_samples
+        self.max_chunks = max(2, memory_cap // (chunk_samples * 2))
+        self.spill_policy = spill_policy
+
+        self.chunks = [np.empty(chunk_samples, dtype=np.int16)]
+        self.fill = 0               # Samples used in the last chunk
+        self.spare = []             # Recycled chunks, ready to be reused
+        self.spill_file = None
+        self.spilled_samples = 0
+        self.dropped_samples = 0
+
+    def __len__(self):
+        """
+        The number of samples that can still be read back (spilled + in memory).
+        """
+        return self.spilled_samples + (len(self.chunks) - 1) * self.chunk_samples + self.fill
+
+    def append(self, data):
+        """
+        Copies a PCM buffer (bytes or int16 array) into the arena.
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        while len(samples):
+            if self.fill == self.chunk_samples and not self.next_chunk():
+                self.dropped_samples += len(samples)
+                return
+            count = min(len(samples), self.chunk_samples - self.fill)
+            self.chunks[-1][self.fill:self.fill + count] = samples[:count]
+            self.fill += count
+            samples = samples[count:]
+
+    def next_chunk(self):
+        """
+        Starts a new chunk, applying the spill policy when the memory cap is reached.
+        Returns False when the samples should be dropped.
+        """
+        if len(self.chunks) >= self.max_chunks:
+            if self.spill_policy == "drop_newest":
+                return False
+            oldest = self.chunks.pop(0)
+            if self.spill_policy == "spill":
+                if self.spill_file is None:
+                    self.spill_file = tempfile.TemporaryFile(prefix="ambario-pcm-")
+                oldest.tofile(self.spill_file)
+                self.spilled_samples += len(oldest)
+            else:
+                self.dropped_samples += len(oldest)
+            self.spare.append(oldest)
+
+        self.chunks.append(self.spare.pop() if self.spare else np.empty(self.chunk_samples, dtype=np.int16))
+        self.fill = 0
+        return True
+
+    def iter_chunks(self):
+        """
+        Yields the stored samples in order as int16 arrays, the spilled ones first, one chunk at a time.
+        """
+        if self.spill_file is not None:
+            self.spill_file.flush()
+            self.spill_file.seek(0)
+            remaining = self.spilled_samples
+            while remaining:
+                chunk = np.fromfile(self.spill_file, dtype=np.int16, count=min(remaining, self.chunk_samples))
+                remaining -= len(chunk)
+                yield chunk
+            self.spill_file.seek(0, os.SEEK_END)
+
+        for chunk in self.chunks[:-1]:
+            yield chunk
+        yield self.chunks[-1][:self.fill]
+
+    def close(self):
+        """
+        Deletes the spill file, if there is one.
+        """
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
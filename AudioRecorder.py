@@ -1,69 +1,173 @@
-import pyaudio
 import threading
+import time
 import numpy as np
 import wave
+from AudioBuffer import PCMArena
+from WavWriter import WavStreamWriter
+from AudioAnalysis import LoudnessAnalyzer, OnsetDetector, AudioSnapshot
+from AudioSource import MicrophoneSource
 
 class AudioRecorder(threading.Thread):
     """
     Sepearete thread for recording audio. since the Nature of Python that can't do recording and processing at the same time.
     filename: str, default="output/output.wav" - The name of the file to save the audio recording.
-    rate: int, default=44100 - The sampling rate of the audio.
+    rate: int, default=44100 - The sampling rate of the audio, a given source uses its own rate.
     frames_per_buffer: int, default=1024 - The number of frames per buffer.
+    source: AudioSource, default=None - Where the PCM comes from, None opens the microphone (MicrophoneSource).
+        A WavFileSource replays a recording through the same analysis, for runs without a microphone.
+    audio_sink: callable, default=None - Called with every recorded PCM buffer, e.g. to stream it to the StreamingMuxer.
+    use_callback: bool, default=True - Let the source call us with every buffer (PyAudio stream_callback) instead of
+        a thread that spins on the blocking read. start() / stop() / save() / volume work the same in both modes.
+    stream_to_disk: bool, default=True - Write the WAV while recording with a WavStreamWriter. When False the PCM
+        is kept in a PCMArena and written by save().
+    memory_cap: int, default=64 * 1024 * 1024 - The maximum number of bytes of PCM kept in memory when not streaming.
+    spill_policy: str, default="spill" - What to do with the PCM past memory_cap, see PCMArena.
+    onset_window: int, default=1024 - The window of the OnsetDetector in samples, None turns the onset detection off.
+    onset_hop: int, default=256 - The hop of the OnsetDetector in samples. Use a small frames_per_buffer as well,
+        the onsets can't be seen before PyAudio hands over the buffer.
+    onset_threshold: float, default=500 - The RMS that counts as the start of a scream.
     """
-    def __init__(self, filename="output/output.wav", rate=44100, frames_per_buffer=1048):
-        super(AudioRecorder, self).__init__()
+    def __init__(self, filename="output/output.wav", rate=44100, frames_per_buffer=1048, source=None, audio_sink=None, use_callback=True,
+                 stream_to_disk=True, memory_cap=64 * 1024 * 1024, spill_policy="spill",
+                 onset_window=1024, onset_hop=256, onset_threshold=500):
+        super(AudioRecorder, self).__init__(daemon=True)
+        self.source = source if source is not None else MicrophoneSource(rate, frames_per_buffer)
         self.filename = filename
-        self.rate = rate
+        self.rate = rate = self.source.rate
         self.frames_per_buffer = frames_per_buffer
-        self.audio_frames = []
+        self.audio_sink = audio_sink
+        self.use_callback = use_callback
+        if stream_to_disk:
+            self.audio_buffer = None
+            self.wav_writer = WavStreamWriter(filename, rate, channels=1, sample_width=2)
+        else:
+            self.audio_buffer = PCMArena(chunk_samples=rate * 10, memory_cap=memory_cap, spill_policy=spill_policy)
+            self.wav_writer = None
+        self.analyzer = LoudnessAnalyzer(rate, max_samples=frames_per_buffer)
+        self.onset_detector = None
+        if onset_window:
+            self.onset_detector = OnsetDetector(rate, onset_window, onset_hop, onset_threshold)
         self.volume = 0
+        self.peak = 0
+        self.envelope = 0
+        self.noise_floor = 0
+        self.sample_index = 0
         self.running = False
 
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(format=pyaudio.paInt16,
-                                  channels=1,
-                                  rate=self.rate,
-                                  input=True,
-                                  frames_per_buffer=self.frames_per_buffer)
+        ## The newest AudioSnapshot, replaced as a whole by the audio thread, see publish
+        self.latest_snapshot = AudioSnapshot(0, 0, 0, time.monotonic(), 0)
 
-    def run(self):
+    def start(self):
         """
-        Background thread to record audio. in this steps we do the calculation of the volume of the audio.
-        using the formula: volume = np.linalg.norm(audio_data) / np.sqrt(len(audio_data))
-        which is the RMS value of the audio data. 
+        Starts the recording. In callback mode this only starts the source, no thread is created.
         """
         self.running = True
-        while self.running:
-            try:
-                data = self.stream.read(self.frames_per_buffer, exception_on_overflow=False)
-                self.audio_frames.append(data)
+        if self.wav_writer is not None:
+            self.wav_writer.start()
+        if self.use_callback:
+            self.source.start(self.callback)
+        else:
+            self.source.start()
+            super(AudioRecorder, self).start()
 
-                # Calculate volume
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                if len(audio_data) == 0 or np.all(audio_data == 0):
-                    self.volume = 0
-                else:
-                    self.volume = np.linalg.norm(audio_data) / np.sqrt(len(audio_data))
+    def process(self, data):
+        """
+        Stores one PCM buffer and updates the loudness of the audio with the LoudnessAnalyzer.
+        volume is the RMS value of the buffer, envelope is the smoothed volume that detect_scream uses.
+        """
+        if self.wav_writer is not None:
+            self.wav_writer.write(data)
+        else:
+            self.audio_buffer.append(data)
+        if self.audio_sink is not None:
+            self.audio_sink(data)
+
+        # Calculate volume
+        now = time.monotonic()
+        audio_data = np.frombuffer(data, dtype=np.int16)
+        if self.onset_detector is not None:
+            self.onset_detector.feed(audio_data, now)
+        loudness = self.analyzer.analyze(audio_data)
+        self.volume = loudness.rms
+        self.peak = loudness.peak
+        self.envelope = loudness.envelope
+        self.noise_floor = loudness.noise_floor
+        self.sample_index += len(audio_data)
+        self.publish(AudioSnapshot(loudness.rms, loudness.envelope, self.sample_index, now,
+                                   self.onset_detector.onset_count if self.onset_detector is not None else 0))
 
+    def publish(self, snapshot):
+        """
+        Publishes a new snapshot. There is no lock: the snapshot is an immutable namedtuple and assigning one
+        reference is atomic in CPython, so the game thread always reads a whole snapshot, never a half written one.
+        """
+        self.latest_snapshot = snapshot
+
+    def snapshot(self):
+        """
+        Returns the newest AudioSnapshot(volume, envelope, sample_index, timestamp, onset_count).
+        The timestamp is the time.monotonic() of the buffer, so the game can tell how old the input is,
+        and an unchanged sample_index means there was no new audio since the last call.
+        It never waits on the audio thread.
+        """
+        return self.latest_snapshot
+
+    def drain_onsets(self):
+        """
+        Returns the scream onsets detected since the last call, empty when the onset detection is off.
+        """
+        if self.onset_detector is None:
+            return []
+        return self.onset_detector.drain()
+
+    def callback(self, data):
+        """
+        Called by the source for every recorded buffer, on the PortAudio thread for the microphone.
+        """
+        if not self.running:
+            return
+        try:
+            self.process(data)
+        except Exception as e:
+            print("Audio recording error:", e)
+
+    def run(self):
+        """
+        Background thread to record audio when the callback mode is off. It reads the blocking source
+        and hands every buffer to process(), until the source ends.
+        """
+        while self.running:
+            try:
+                data = self.source.read()
+                if not data:
+                    break
+                self.process(data)
             except Exception as e:
                 print("Audio recording error:", e)
 
     def stop(self):
         """
-        Stops the audio recording.
+        Stops the audio recording. The reading thread is joined before the source is closed,
+        so it can't read from a stream that is already shut down.
         """
         self.running = False
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        if not self.use_callback and self.is_alive():
+            self.join()
+        self.source.close()
 
     def save(self):
         """
-        Saves the recorded audio to a WAV file.
+        Saves the recorded audio to a WAV file. When streaming to disk the file is already written,
+        this only waits for the writer to finish. Otherwise the arena is written one chunk at a time.
         """
+        if self.wav_writer is not None:
+            self.wav_writer.close()
+            return
+
         with wave.open(self.filename, 'wb') as wavefile:
             wavefile.setnchannels(1)
-            wavefile.setsampwidth(self.p.get_sample_size(pyaudio.paInt16))
+            wavefile.setsampwidth(2)  # paInt16
             wavefile.setframerate(self.rate)
-            wavefile.writeframes(b''.join(self.audio_frames))
-
+            for chunk in self.audio_buffer.iter_chunks():
+                wavefile.writeframes(chunk)
+        self.audio_buffer.close()
@@ -0,0 +1,133 @@
+import threading
+import time
+import wave
+import numpy as np
+
+class AudioSource:
+    """
+    Base class for where the AudioRecorder gets its PCM from. A source gives mono int16 buffers of
+    frames_per_buffer samples, either pushed to a callback with start(callback) or pulled with read().
+    rate: int - The sampling rate of the audio.
+    frames_per_buffer: int - The number of samples per buffer.
+    """
+    def __init__(self, rate, frames_per_buffer):
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+
+    def start(self, callback=None):
+        """
+        Starts the source. With a callback every buffer is pushed to callback(data), otherwise use read().
+        """
+        raise NotImplementedError
+
+    def read(self):
+        """
+        Blocks until the next buffer is there and returns it as bytes, b"" when the source has ended.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Stops the source and frees what it holds.
+        """
+        raise NotImplementedError
+
+class MicrophoneSource(AudioSource):
+    """
+    Live input from the default microphone with PyAudio. PyAudio is only imported here,
+    so the replay source can run on machines without it.
+    rate: int, default=44100 - The sampling rate of the audio.
+    frames_per_buffer: int, default=1048 - The number of samples per buffer.
+    """
+    def __init__(self, rate=44100, frames_per_buffer=1048):
+        super(MicrophoneSource, self).__init__(rate, frames_per_buffer)
+        import pyaudio
+        self.pyaudio = pyaudio
+        self.p = pyaudio.PyAudio()
+        self.stream = None
+        self.callback = None
+
+    def start(self, callback=None):
+        self.callback = callback
+        self.stream = self.p.open(format=self.pyaudio.paInt16,
+                                  channels=1,
+                                  rate=self.rate,
+                                  input=True,
+                                  frames_per_buffer=self.frames_per_buffer,
+                                  stream_callback=self.stream_callback if callback else None)
+
+    def stream_callback(self, in_data, frame_count, time_info, status):
+        """
+        PyAudio stream callback, runs on the PortAudio thread for every recorded buffer.
+        """
+        self.callback(in_data)
+        return (None, self.pyaudio.paContinue)
+
+    def read(self):
+        return self.stream.read(self.frames_per_buffer, exception_on_overflow=False)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        self.p.terminate()
+
+class WavFileSource(AudioSource):
+    """
+    Replays a recorded WAV file as if it came from the microphone, for deterministic offline runs and CI.
+    Stereo files are mixed down to mono, the file has to be 16 bit.
+    filename: str - The WAV file to replay.
+    frames_per_buffer: int, default=1048 - The number of samples per buffer.
+    realtime: bool, default=True - Hand out the buffers at the pace of the recording, False is as fast as possible.
+    """
+    def __init__(self, filename, frames_per_buffer=1048, realtime=True):
+        self.wavefile = wave.open(filename, 'rb')
+        if self.wavefile.getsampwidth() != 2:
+            raise ValueError(f"{filename} is not a 16 bit WAV file")
+        super(WavFileSource, self).__init__(self.wavefile.getframerate(), frames_per_buffer)
+        self.channels = self.wavefile.getnchannels()
+        self.realtime = realtime
+        self.start_time = None
+        self.samples_read = 0
+        self.running = False
+        self.thread = None
+        self.finished = threading.Event()
+
+    def start(self, callback=None):
+        self.running = True
+        self.start_time = time.monotonic()
+        if callback:
+            self.thread = threading.Thread(target=self.push, args=(callback,), daemon=True)
+            self.thread.start()
+
+    def push(self, callback):
+        """
+        Background thread for the callback mode, pushes the buffers until the file ends or close() is called.
+        """
+        while self.running:
+            data = self.read()
+            if not data:
+                break
+            callback(data)
+
+    def read(self):
+        data = self.wavefile.readframes(self.frames_per_buffer)
+        if not data:
+            self.finished.set()
+            return b""
+        if self.channels > 1:
+            samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+            data = samples.mean(axis=1).astype(np.int16).tobytes()
+        self.samples_read += len(data) // 2
+
+        if self.realtime:
+            delay = self.start_time + self.samples_read / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def close(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.wavefile.close()
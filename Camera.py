@@ -0,0 +1,48 @@
+import pygame
+
+class Camera:
+    """
+    Class for the scrolling view over the level. The platforms, pipes, blocks and the castle keep their world
+    coordinates for the whole game, only the camera offset moves. A rect is converted to screen space when it is drawn,
+    and only when it overlaps the viewport, so entities far off screen cost nothing.
+    The offset before the last scroll is kept too, so a frame drawn between two simulation ticks can put the camera
+    part of the way between them, see render_offset.
+    width: int, default=640 - The width of the viewport.
+    height: int, default=480 - The height of the viewport.
+    """
+    def __init__(self, width=640, height=480):
+        self.offset = 0
+        self.previous_offset = 0
+        self.viewport = pygame.Rect(0, 0, width, height)
+
+    def scroll(self, dx):
+        """
+        Moves the view dx pixels to the right in the world.
+        """
+        self.previous_offset = self.offset
+        self.offset += dx
+        self.viewport.x = self.offset
+
+    def render_offset(self, alpha=1.0):
+        """
+        Returns the offset alpha of the way from the one before the last scroll to the current one.
+        """
+        return round(self.previous_offset + (self.offset - self.previous_offset) * alpha)
+
+    def render_viewport(self, alpha=1.0):
+        """
+        Returns a copy of the viewport at render_offset(alpha).
+        """
+        return self.viewport.move(self.render_offset(alpha) - self.offset, 0)
+
+    def to_screen(self, rect, offset=None):
+        """
+        Returns a copy of a world rect in screen coordinates, at the current offset or the given one.
+        """
+        return rect.move(-(self.offset if offset is None else offset), 0)
+
+    def to_world(self, rect):
+        """
+        Returns a copy of a screen rect in world coordinates.
+        """
+        return rect.move(self.offset, 0)
@@ -0,0 +1,100 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+class CameraCapture(threading.Thread):
+    """
+    Separate thread for grabbing frames from the webcam, so the pygame loop never waits on the camera driver.
+    The frames are written into a small preallocated ring, the game loop only take the newest one.
+    device: int, default=0 - The index of the camera passed to cv2.VideoCapture.
+    ring_size: int, default=3 - The number of frames slots kept in the ring.
+    """
+    def __init__(self, device=0, ring_size=3):
+        super(CameraCapture, self).__init__(daemon=True)
+        self.device = device
+        self.ring_size = ring_size
+        self.video_cap = cv2.VideoCapture(device)
+        self.running = False
+
+        self.ring = None
+        self.sequence = 0          # Sequence number of the newest frame in the ring
+        self.last_read = 0         # Sequence number of the last frame handed to the game loop
+        self.captured_frames = 0
+        self.dropped_frames = 0    # Frames that were overwritten before the game loop read them
+        self.duplicated_frames = 0 # Times the game loop got the same frame again
+        self.lock = threading.Lock()
+
+    def fps(self):
+        """
+        Returns the native frame rate reported by the camera, or 0 if the driver doesn't know.
+        """
+        return self.video_cap.get(cv2.CAP_PROP_FPS)
+
+    def run(self):
+        """
+        Background thread to capture the frames. The ring is allocated once from the first frame,
+        after that every frame is decoded straight into the next free slot with no new allocation.
+        """
+        self.running = True
+        while self.running:
+            if self.ring is None:
+                ret, frame = self.video_cap.read()
+                if not ret:
+                    time.sleep(0.01)
+                    continue
+                self.ring = np.empty((self.ring_size,) + frame.shape, dtype=frame.dtype)
+                self.ring[0] = frame
+                self.publish()
+                continue
+
+            slot = self.ring[self.sequence % self.ring_size]
+            ret, _ = self.video_cap.read(slot)
+            if not ret:
+                time.sleep(0.01)
+                continue
+            self.publish()
+
+    def publish(self):
+        """
+        Marks the slot that was just written as the newest frame.
+        """
+        with self.lock:
+            self.sequence += 1
+            self.captured_frames += 1
+            if self.sequence - self.last_read > 1 and self.last_read > 0:
+                self.dropped_frames += 1
+
+    def read(self):
+        """
+        Returns the newest frame without blocking, with the same (ret, frame) shape as cv2.VideoCapture.read.
+        ret is False when no frame has been captured yet. The returned frame is a view into the ring,
+        it stays valid until ring_size - 1 more frames are captured.
+        """
+        with self.lock:
+            if self.sequence == 0:
+                return False, None
+            if self.sequence == self.last_read:
+                self.duplicated_frames += 1
+            self.last_read = self.sequence
+            return True, self.ring[(self.sequence - 1) % self.ring_size]
+
+    def stats(self):
+        """
+        Returns the capture counters as a dictionary, handy for printing at the end of a session.
+        """
+        with self.lock:
+            return {
+                "captured": self.captured_frames,
+                "dropped": self.dropped_frames,
+                "duplicated": self.duplicated_frames,
+            }
+
+    def stop(self):
+        """
+        Stops the capture thread and releases the camera.
+        """
+        self.running = False
+        if self.is_alive():
+            self.join()
+        self.video_cap.release()
@@ -0,0 +1,53 @@
+import pygame
+import cv2
+import numpy as np
+
+class FrameIngest:
+    """
+    Class to put the camera frame into the background of the game without creating a new Surface every tick.
+    The frame is written straight into one persistent Surface. The BGR to RGB swizzle, the mirror and the
+    row/column swap of the old cvtColor + rot90 + make_surface path are all done in a single copy.
+    size: tuple, default=(640, 480) - The size of the background surface, usually the size of the screen.
+    """
+    def __init__(self, size=(640, 480)):
+        self.size = size
+        self.surface = pygame.Surface(size).convert()
+        self.scaled = np.empty((size[1], size[0], 3), dtype=np.uint8)  # Only used when the camera size differs
+
+    def ingest(self, frame):
+        """
+        Writes the BGR camera frame into the background surface and returns the surface.
+        """
+        height, width = frame.shape[:2]
+        if (width, height) != self.size:
+            cv2.resize(frame, self.size, dst=self.scaled)
+            frame = self.scaled
+
+        ## pixels3d is indexed [x, y, channel], so swap the axes and flip both the columns and the channels
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        pixels[...] = frame[:, ::-1, ::-1].swapaxes(0, 1)
+        del pixels  # Unlock the surface so it can be blitted
+        return self.surface
+
+class FrameExporter:
+    """
+    Class to read the display surface into a BGR frame for the cv2.VideoWriter.
+    The old path did np.array + np.transpose + cvtColor, three full copies per frame. Here the surface
+    pixels are copied once into a preallocated buffer with the axes and channels swapped on the way.
+    size: tuple, default=(640, 480) - The size of the surface that will be exported.
+    """
+    def __init__(self, size=(640, 480)):
+        self.size = size
+        self.buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+
+    def export(self, surface, out=None):
+        """
+        Copies the surface into out (or the internal buffer) as a (height, width, 3) BGR array and returns it.
+        The internal buffer is overwritten on the next call, so write it before exporting again.
+        """
+        if out is None:
+            out = self.buffer
+        pixels = pygame.surfarray.pixels3d(surface)
+        out[...] = pixels.swapaxes(0, 1)[:, :, ::-1]
+        del pixels  # Unlock the surface again
+        return out
@@ -0,0 +1,297 @@
+"""
+A level is a folder with a level.json and one file per chunk:
+level.json - {"chunk_width": 800, "chunks": ["chunk-0.json", ...]}, chunk i covers world x [i * chunk_width, (i + 1) * chunk_width)
+chunk-i.json - {"platforms": [[x, y], ...], "blocks": [[x, y], ...], "castle": [x, y]}
+Platforms are placed by their top left corner, blocks and the castle by their mid bottom, every entity goes in the
+chunk of its x. An entity may stick out of its chunk on both sides, e.g. a castle less than half its width past the
+start of its chunk, the strips of all the chunks it overlaps draw their part of it. The bottom limit for the platforms is around 400, since the wave will block the view of the platforms.
+"""
+import json
+import os
+import random
+import pygame
+from Sprite import Block
+from SpatialIndex import IntervalIndex
+
+class ObjectPool:
+    """
+    Pool of reusable objects, so a long run recycles its rects and sprites instead of creating new ones.
+    factory: callable - Creates a new object from the acquire arguments, when the pool is empty.
+    reset: callable - Sets up a recycled object with the acquire arguments, called as reset(obj, *args).
+    """
+    def __init__(self, factory, reset):
+        self.factory = factory
+        self.reset = reset
+        self.free = []
+        self.created = 0
+
+    def acquire(self, *args):
+        """
+        Returns a recycled object set up with args, or a new one when there is nothing to recycle.
+        """
+        if self.free:
+            obj = self.free.pop()
+            self.reset(obj, *args)
+            return obj
+        self.created += 1
+        return self.factory(*args)
+
+    def release(self, obj):
+        """
+        Gives an object back to the pool, it must not be used any more until it is acquired again.
+        """
+        self.free.append(obj)
+
+def reset_rect(rect, size):
+    """
+    Resets a recycled rect for the rect pool, the caller places it.
+    """
+    rect.size = size
+
+class LevelChunk:
+    """
+    Everything that lives in one chunk of the level: the platform rects, their pipes, the Block sprites
+    and maybe the castle.
+    index: int - The position of the chunk in the level.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.platforms = []
+        self.pipes = []
+        self.blocks = []
+        self.castle_rect = None
+        self.strip = None
+        self.strip_rect = None
+
+class LevelStreamer:
+    """
+    Class to stream a level from its data files. Only the chunks around the viewport are in memory: a chunk is loaded
+    when it comes within lookahead pixels of the right edge of the view, and released once it is release_margin pixels
+    behind the left edge. So startup time and memory don't depend on the length of the level.
+    The loaded entities are kept in IntervalIndex objects and a sprite Group, the same ones for the whole game.
+    The platforms, pipes and the castle never change, so every chunk draws them once into a strip surface as wide as
+    the chunk, together with what sticks out of the chunk before it. A frame then blits the strips under the viewport,
+    at most two, however many platforms there are. The strips hold premultiplied alpha, so the soft edges of the
+    castle blend the same as when it is drawn on its own, blit them with BLEND_PREMULTIPLIED.
+    path: str - The folder of the level, None for a subclass that makes its own chunks.
+    platform_image: pygame.Surface - The platform image, its size is the size of a platform.
+    pipe_image: pygame.Surface - The pipe image, its size is the size of a pipe.
+    castle_image: pygame.Surface - The castle image, its size is the size of the castle.
+    lookahead: int, default=640 - How far ahead of the viewport the chunks are loaded.
+    release_margin: int, default=400 - How far behind the viewport a chunk is kept, at least the widest entity.
+    strip_height: int, default=480 - The height of the strips, the height of the screen.
+    """
+    def __init__(self, path, platform_image, pipe_image, castle_image, lookahead=640, release_margin=400,
+                 strip_height=480):
+        self.path = path
+        self.platform_size = platform_image.get_size()
+        self.pipe_size = pipe_image.get_size()
+        self.castle_size = castle_image.get_size()
+        self.lookahead = lookahead
+        self.release_margin = release_margin
+        self.strip_height = strip_height
+
+        ## Premultiplied copies for drawing into the strips, copied first since premul_alpha reads an atlas
+        ## subsurface from the wrong place
+        self.platform_image = platform_image.copy().premul_alpha()
+        self.pipe_image = pipe_image.copy().premul_alpha()
+        self.castle_image = castle_image.copy().premul_alpha()
+
+        if path is not None:
+            with open(os.path.join(path, "level.json")) as manifest:
+                self.manifest = json.load(manifest)
+            self.chunk_width = self.manifest["chunk_width"]
+            self.chunk_files = self.manifest["chunks"]
+            self.chunk_count = len(self.chunk_files)
+
+        ## Rects and blocks of released chunks are recycled for the chunks that are loaded next
+        self.rect_pool = ObjectPool(lambda size: pygame.Rect((0, 0), size), reset_rect)
+        self.block_pool = ObjectPool(Block, Block.reset)
+        self.strip_pool = ObjectPool(
+            lambda: pygame.Surface((self.chunk_width, self.strip_height), pygame.SRCALPHA, 32),
+            lambda strip: strip.fill((0, 0, 0, 0)))
+
+        self.chunks = {}
+        self.platform_index = IntervalIndex()
+        self.pipe_index = IntervalIndex()
+        self.block_index = IntervalIndex(key=lambda block: block.rect)
+        self.blocks = pygame.sprite.Group()
+        self.castle_rect = None
+
+    def update(self, viewport):
+        """
+        Loads the chunks coming into range of the viewport and releases the ones left behind.
+        """
+        first = max(0, (viewport.left - self.release_margin) // self.chunk_width)
+        last = (viewport.right + self.lookahead) // self.chunk_width
+        if self.chunk_count is not None:
+            last = min(self.chunk_count - 1, last)
+
+        for index in [index for index in self.chunks if index < first or index > last]:
+            self.release(self.chunks.pop(index))
+        for index in range(first, last + 1):
+            if index not in self.chunks:
+                self.chunks[index] = self.load(index)
+
+    def chunk_data(self, index):
+        """
+        Returns the data of one chunk, in the format of the chunk files. Here it is read from the chunk file.
+        """
+        with open(os.path.join(self.path, self.chunk_files[index])) as chunk_file:
+            return json.load(chunk_file)
+
+    def load(self, index):
+        """
+        Builds one chunk from its data and adds its entities to the indexes.
+        """
+        data = self.chunk_data(index)
+        chunk = LevelChunk(index)
+        width, height = self.platform_size
+        for x, y in data.get("platforms", []):
+            platform_rect = self.rect_pool.acquire(self.platform_size)
+            platform_rect.topleft = (x, y)
+            pipe_rect = self.rect_pool.acquire(self.pipe_size)
+            pipe_rect.midtop = (x + width // 2, y + height)
+            chunk.platforms.append(platform_rect)
+            chunk.pipes.append(pipe_rect)
+            self.platform_index.insert(platform_rect)
+            self.pipe_index.insert(pipe_rect)
+
+        for x, y in data.get("blocks", []):
+            block = self.block_pool.acquire(x, y)
+            chunk.blocks.append(block)
+            self.block_index.insert(block)
+            self.blocks.add(block)
+
+        if "castle" in data:
+            chunk.castle_rect = pygame.Rect((0, 0), self.castle_size)
+            chunk.castle_rect.midbottom = tuple(data["castle"])
+            self.castle_rect = chunk.castle_rect
+        self.render_strip(chunk)
+        return chunk
+
+    def render_strip(self, chunk):
+        """
+        Draws the platforms, pipes and castles that overlap a chunk into its strip. The chunk before must already
+        be loaded for what sticks out of it, update loads the chunks from left to right.
+        The last chunk of a level has no chunk after it, so its strip is made wide enough for what sticks out of it.
+        """
+        left = chunk.index * self.chunk_width
+        chunk.strip_rect = pygame.Rect(left, 0, self.chunk_width, self.strip_height)
+        platforms = self.platform_index.query(chunk.strip_rect)
+        pipes = self.pipe_index.query(chunk.strip_rect)
+        castles = [other.castle_rect for other in [*self.chunks.values(), chunk]
+                   if other.castle_rect is not None and other.castle_rect.colliderect(chunk.strip_rect)]
+
+        if self.chunk_count is not None and chunk.index == self.chunk_count - 1:
+            chunk.strip_rect.width = max([rect.right for rect in platforms + pipes + castles] + [left + self.chunk_width]) - left
+        if chunk.strip_rect.width == self.chunk_width:
+            chunk.strip = self.strip_pool.acquire()
+        else:
+            chunk.strip = pygame.Surface(chunk.strip_rect.size, pygame.SRCALPHA, 32)
+
+        for image, rects in [(self.platform_image, platforms), (self.pipe_image, pipes), (self.castle_image, castles)]:
+            for rect in rects:
+                chunk.strip.blit(image, rect.move(-left, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+
+        ## What sticks out of the left of the chunk goes into the strip before it, which is drawn already
+        previous = self.chunks.get(chunk.index - 1)
+        if previous is not None:
+            castle = [chunk.castle_rect] if chunk.castle_rect is not None else []
+            for image, rects in [(self.platform_image, chunk.platforms), (self.pipe_image, chunk.pipes),
+                                 (self.castle_image, castle)]:
+                for rect in rects:
+                    if rect.left < left:
+                        previous.strip.blit(image, rect.move(-previous.strip_rect.left, 0),
+                                            special_flags=pygame.BLEND_PREMULTIPLIED)
+
+    def strips(self, viewport):
+        """
+        Returns the (strip, world rect) of the loaded chunks that overlap the viewport.
+        """
+        return [(chunk.strip, chunk.strip_rect) for chunk in self.chunks.values()
+                if chunk.strip_rect.colliderect(viewport)]
+
+    def release(self, chunk):
+        """
+        Removes the entities of a chunk from the indexes and gives them back to the pools.
+        """
+        for platform_rect in chunk.platforms:
+            self.platform_index.remove(platform_rect)
+            self.rect_pool.release(platform_rect)
+        for pipe_rect in chunk.pipes:
+            self.pipe_index.remove(pipe_rect)
+            self.rect_pool.release(pipe_rect)
+        for block in chunk.blocks:
+            self.block_index.remove(block)
+            block.kill()
+            self.block_pool.release(block)
+        if chunk.castle_rect is not None and chunk.castle_rect is self.castle_rect:
+            self.castle_rect = None
+        if chunk.strip.get_width() == self.chunk_width:
+            self.strip_pool.release(chunk.strip)
+
+class ProceduralLevel(LevelStreamer):
+    """
+    Endless level made up on the fly, for an arcade like attract mode. Every chunk is generated from the seed and its
+    own index, so the same seed always gives the same level whatever order the chunks are loaded in.
+    A chunk has one platform per slot of chunk_width / slots pixels, with a small random shift so the gaps stay jumpable.
+    Two platforms in a row never differ more than max_step pixels in height, also across chunks: the height of the
+    first platform of every chunk only depends on the seed and the chunk index, so the chunk before can steer towards it.
+    Some platforms get a piranha Block. There is no castle, the run ends when the player dies.
+    The rects and the blocks come from the pools of LevelStreamer, so the memory stays flat however long the run is.
+    seed: int - The seed of the level.
+    platform_image, pipe_image, castle_image, lookahead, release_margin - See LevelStreamer.
+    chunk_width: int, default=800 - The width of a chunk.
+    slots: int, default=3 - The number of platforms per chunk.
+    block_chance: float, default=0.3 - The chance that a platform gets a piranha.
+    max_step: int, default=75 - The largest height difference between two platforms in a row.
+    """
+    TOP = 175     # Highest platform, the HUD is above it
+    BOTTOM = 350  # Lowest platform, the wave hides anything lower
+    STEP = 25
+
+    def __init__(self, seed, platform_image, pipe_image, castle_image, lookahead=640, release_margin=400,
+                 chunk_width=800, slots=3, block_chance=0.3, max_step=75):
+        super(ProceduralLevel, self).__init__(None, platform_image, pipe_image, castle_image, lookahead, release_margin)
+        self.seed = seed
+        self.chunk_width = chunk_width
+        self.chunk_count = None
+        self.slots = slots
+        self.block_chance = block_chance
+        self.max_step = max_step
+
+    def start_height(self, index):
+        """
+        Returns the height of the first platform of a chunk. The first chunk starts under the player.
+        """
+        if index == 0:
+            return self.BOTTOM
+        return random.Random(f"{self.seed}:{index}:start").randrange(self.TOP, self.BOTTOM + 1, self.STEP)
+
+    def chunk_data(self, index):
+        """
+        Generates the data of one chunk, in the format of the chunk files.
+        """
+        rng = random.Random(f"{self.seed}:{index}")
+        slot_width = self.chunk_width // self.slots
+        shift = max(0, slot_width - self.platform_size[0] - 20)
+        next_height = self.start_height(index + 1)
+        data = {"platforms": [], "blocks": []}
+
+        y = self.start_height(index)
+        for slot in range(self.slots):
+            x = index * self.chunk_width + slot * slot_width + rng.randint(0, shift)
+            if slot > 0:
+                ## Stay reachable from the last platform and close enough to the start of the next chunk
+                reach = self.max_step * (self.slots - slot)
+                low = max(self.TOP, y - self.max_step, next_height - reach)
+                high = min(self.BOTTOM, y + self.max_step, next_height + reach)
+                y = rng.randrange(low, high + 1, self.STEP)
+
+            if index == 0 and slot == 0:
+                x = 100  # Under the player at the start
+            elif rng.random() < self.block_chance:
+                data["blocks"].append([x + 50, y])
+            data["platforms"].append([x, y])
+        return data
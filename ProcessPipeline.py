@@ -0,0 +1,275 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+
+class SharedFrameRing:
+    """
+    Ring of frame slots in multiprocessing.shared_memory, so frames move between processes without pickling.
+    Every slot has a sequence number in front of the pixel data. A writer sets it to -1 while it writes the slot,
+    and to the frame sequence number when the slot is complete.
+    slots: int - The number of frame slots.
+    shape: tuple - The shape of one frame, (height, width, 3).
+    name: str, default=None - Name of an existing ring to attach to, None creates a new one.
+    """
+    HEADER_SIZE = 64  # Keep the pixel data aligned
+
+    def __init__(self, slots, shape, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        header = max(self.HEADER_SIZE, slots * 8)
+        size = header + slots * int(np.prod(self.shape))
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=self.memory.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.memory.buf, offset=header)
+        if self.owner:
+            self.sequences[:] = 0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def close(self):
+        """
+        Detaches from the ring, the process that created it also frees the memory.
+        """
+        del self.sequences, self.frames
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+def capture_worker(device, ring_name, slots, shape, latest, stop_event, camera_fps, opened):
+    """
+    Body of the capture process: reads the camera into the shared ring and publishes the newest sequence number.
+    The native frame rate of the camera is published in camera_fps once it is open, then opened is set.
+    """
+    ring = SharedFrameRing(slots, shape, ring_name)
+    video_cap = cv2.VideoCapture(device)
+    video_cap.set(cv2.CAP_PROP_FRAME_WIDTH, shape[1])
+    video_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, shape[0])
+    camera_fps.value = video_cap.get(cv2.CAP_PROP_FPS)
+    opened.set()
+    sequence = 0
+    while not stop_event.is_set():
+        ret, frame = video_cap.read()
+        if not ret:
+            time.sleep(0.01)
+            continue
+        sequence += 1
+        slot = sequence % slots
+        ring.sequences[slot] = -1
+        if frame.shape == ring.shape:
+            ring.frames[slot] = frame
+        else:
+            cv2.resize(frame, (shape[1], shape[0]), dst=ring.frames[slot])
+        ring.sequences[slot] = sequence
+        latest.value = sequence
+    video_cap.release()
+    ring.close()
+
+def encoder_worker(filename, fourcc, fps, ring_name, slots, shape, filled, free, written):
+    """
+    Body of the encoder process: writes the slots handed over in filled, in order, and gives them back through free.
+    """
+    ring = SharedFrameRing(slots, shape, ring_name)
+    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*fourcc), fps, (shape[1], shape[0]))
+    while True:
+        item = filled.get()
+        if item is None:
+            break
+        slot, sequence = item
+        if ring.sequences[slot] == sequence:
+            writer.write(ring.frames[slot])
+            with written.get_lock():
+                written.value += 1
+        free.put(slot)
+    writer.release()
+    ring.close()
+
+class CaptureProcess:
+    """
+    Runs cv2.VideoCapture in its own process, so decoding the camera doesn't compete with the game for the GIL.
+    Same read() / stats() / stop() calls as CameraCapture, the frames come through a SharedFrameRing.
+    device: int, default=0 - The index of the camera.
+    size: tuple, default=(640, 480) - The frame size, frames of another size are resized in the capture process.
+    ring_size: int, default=3 - The number of frame slots in the ring.
+    """
+    def __init__(self, device=0, size=(640, 480), ring_size=3):
+        self.ring = SharedFrameRing(ring_size, (size[1], size[0], 3))
+        self.frame = np.empty(self.ring.shape, dtype=np.uint8)  # Local copy handed to the game loop
+        self.latest = multiprocessing.Value("q", 0, lock=False)
+        self.stop_event = multiprocessing.Event()
+        self.camera_fps = multiprocessing.Value("d", 0.0, lock=False)
+        self.opened = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=capture_worker,
+            args=(device, self.ring.name, ring_size, self.ring.shape, self.latest, self.stop_event,
+                  self.camera_fps, self.opened),
+            daemon=True)
+        self.started = False
+
+        self.last_read = 0
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.duplicated_frames = 0
+
+    def start(self):
+        """
+        Starts the capture process.
+        """
+        self.process.start()
+        self.started = True
+
+    def fps(self, timeout=5.0):
+        """
+        Returns the native frame rate reported by the camera, or 0 if the driver doesn't know.
+        The capture process reports it once the camera is open, so call start() first: this waits up to timeout
+        seconds for the camera and returns 0 before start() or when the camera doesn't open in time.
+        """
+        if not self.started or not self.opened.wait(timeout):
+            return 0
+        return self.camera_fps.value
+
+    def read(self):
+        """
+        Returns the newest frame without blocking, with the same (ret, frame) shape as cv2.VideoCapture.read.
+        The slot is copied out and its sequence number checked again, a torn copy is retried with the next frame.
+        """
+        while True:
+            sequence = self.latest.value
+            if sequence == 0:
+                return False, None
+            if sequence == self.last_read:
+                self.duplicated_frames += 1
+                return True, self.frame
+
+            slot = sequence % self.ring.slots
+            self.frame[...] = self.ring.frames[slot]
+            if self.ring.sequences[slot] != sequence:
+                continue  # The capture process wrapped around while we were copying
+
+            if self.last_read:
+                self.dropped_frames += sequence - self.last_read - 1
+            self.captured_frames = sequence
+            self.last_read = sequence
+            return True, self.frame
+
+    def stats(self):
+        """
+        Returns the capture counters as a dictionary, the gaps in the sequence numbers are the dropped frames.
+        """
+        return {
+            "captured": self.captured_frames,
+            "dropped": self.dropped_frames,
+            "duplicated": self.duplicated_frames,
+        }
+
+    def stop(self):
+        """
+        Stops the capture process and frees the ring.
+        """
+        self.stop_event.set()
+        self.process.join()
+        self.ring.close()
+
+class EncoderProcess:
+    """
+    Runs the cv2.VideoWriter in its own process. Same acquire() / submit() / write() / stats() / release() calls as
+    VideoEncoder: acquire() returns a slot of a SharedFrameRing, only the slot index crosses the process boundary.
+    filename: str - The name of the video file.
+    fourcc: str, default="XVID" - The fourcc of the video codec.
+    fps: int, default=15 - The frame rate of the video.
+    size: tuple, default=(640, 480) - The size of the video frames.
+    queue_size: int, default=4 - The number of frame slots.
+    policy: str, default="drop_oldest" - What to do when every slot is in use, see VideoEncoder.
+    """
+    POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, filename, fourcc="XVID", fps=15, size=(640, 480), queue_size=4, policy="drop_oldest"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.policy = policy
+        self.ring = SharedFrameRing(queue_size, (size[1], size[0], 3))
+        self.filled = multiprocessing.Queue()
+        self.free = multiprocessing.Queue()
+        for slot in range(queue_size):
+            self.free.put(slot)
+        self.written = multiprocessing.Value("q", 0)
+        self.process = multiprocessing.Process(
+            target=encoder_worker,
+            args=(filename, fourcc, fps, self.ring.name, queue_size, self.ring.shape, self.filled, self.free, self.written),
+            daemon=True)
+
+        self.views = [self.ring.frames[slot] for slot in range(queue_size)]
+        self.slot_of = {id(view): slot for slot, view in enumerate(self.views)}
+        self.sequence = 0
+        self.submitted_frames = 0
+        self.dropped_frames = 0
+        self.stolen_frames = 0  # Queued frames taken back by drop_oldest
+
+    def start(self):
+        """
+        Starts the encoder process.
+        """
+        self.process.start()
+
+    def acquire(self):
+        """
+        Returns a free shared slot to fill, or None when the frame should be skipped.
+        """
+        try:
+            slot = self.free.get(block=self.policy == "block")
+        except queue.Empty:
+            self.dropped_frames += 1
+            if self.policy != "drop_oldest":
+                return None
+            try:
+                slot, _ = self.filled.get_nowait()
+            except queue.Empty:
+                return None
+            self.stolen_frames += 1
+        self.ring.sequences[slot] = -1
+        return self.views[slot]
+
+    def submit(self, buffer):
+        """
+        Hands a slot returned by acquire() to the encoder process.
+        """
+        slot = self.slot_of[id(buffer)]
+        self.sequence += 1
+        self.ring.sequences[slot] = self.sequence
+        self.filled.put((slot, self.sequence))
+        self.submitted_frames += 1
+
+    def write(self, frame):
+        """
+        Same call as cv2.VideoWriter.write, the frame is copied into a shared slot and queued.
+        """
+        buffer = self.acquire()
+        if buffer is not None:
+            buffer[...] = frame
+            self.submit(buffer)
+
+    def stats(self):
+        """
+        Returns the queue depth and the frame counters as a dictionary.
+        """
+        written = self.written.value
+        return {
+            "depth": self.submitted_frames - written - self.stolen_frames,
+            "submitted": self.submitted_frames,
+            "written": written,
+            "dropped": self.dropped_frames,
+        }
+
+    def release(self):
+        """
+        Lets the encoder process write the frames still queued, then waits for it and frees the ring.
+        """
+        self.filled.put(None)
+        self.process.join()
+        del self.views
+        self.ring.close()
@@ -0,0 +1,193 @@
+"""
+Batch tool to tune the scream detection for a venue.
+Every recorded session WAV in a folder is replayed through the same LoudnessAnalyzer and OnsetDetector the game
+uses. Like Game.step, the level of a tick is the larger of the envelope and the onsets latched since the tick before,
+with an OnsetDetector per threshold since the game gives it the scream threshold. The levels are mapped to jump
+forces for a grid of thresholds and gains.
+The sessions are spread over a process pool, so a sweep over hundreds of sessions uses every core.
+
+A session can have a label file next to it (session.txt for session.wav) with the start of every real scream
+in seconds, one per line. A jump is then a false trigger when no labeled scream started in the tolerance before it.
+Without labels a jump is a false trigger when the envelope stays above the threshold for less than min_duration,
+a clap or a bump on the microphone rather than a scream.
+
+Usage: python ScreamSweep.py recordings/ --thresholds 300:900:100 --gains 150,250,400 --csv sweep.csv
+"""
+import argparse
+import concurrent.futures
+import csv
+import glob
+import os
+import sys
+import numpy as np
+from AudioAnalysis import LoudnessAnalyzer, OnsetDetector, scream_jump_force
+from AudioSource import WavFileSource
+
+TICK_RATE = 15          # The game reads the audio once per tick, see Game.TICK_RATE
+FRAMES_PER_BUFFER = 256 # The buffer size Game gives the AudioRecorder
+ONSET_WINDOW = 1024     # The onset window and hop of the AudioRecorder
+ONSET_HOP = 256
+
+def parse_grid(text):
+    """
+    Parses "start:stop:step" (stop included) or "a,b,c" into a list of floats.
+    """
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        return list(np.arange(start, stop + step / 2, step))
+    return [float(part) for part in text.split(",")]
+
+def session_ticks(path, thresholds=()):
+    """
+    Replays a session as fast as possible and returns what the game would read at every tick: the envelope, and for
+    every threshold the loudest onset since the tick before (0 without one), of shape (thresholds, ticks).
+    Tick k is read once (k + 1) / TICK_RATE seconds of audio came in.
+    """
+    source = WavFileSource(path, FRAMES_PER_BUFFER, realtime=False)
+    analyzer = LoudnessAnalyzer(source.rate, max_samples=FRAMES_PER_BUFFER)
+    detectors = [OnsetDetector(source.rate, ONSET_WINDOW, ONSET_HOP, threshold) for threshold in thresholds]
+    samples_per_tick = source.rate / TICK_RATE
+    source.start()
+
+    envelope = []
+    onset_levels = []
+    samples = 0
+    next_tick = samples_per_tick
+    while True:
+        data = source.read()
+        if not data:
+            break
+        audio_data = np.frombuffer(data, dtype=np.int16)
+        loudness = analyzer.analyze(audio_data)
+        samples += len(audio_data)
+        for detector in detectors:
+            detector.feed(audio_data, samples / source.rate)
+        while samples >= next_tick:
+            envelope.append(loudness.envelope)
+            onset_levels.append([max([onset.level for onset in detector.drain()], default=0.0)
+                                 for detector in detectors])
+            next_tick += samples_per_tick
+    source.close()
+    onset_levels = np.array(onset_levels, dtype=np.float32).reshape(len(envelope), len(detectors)).T
+    return np.array(envelope, dtype=np.float32), onset_levels
+
+def load_labels(path):
+    """
+    Returns the labeled scream start times of a session in seconds, or None when it has no label file.
+    """
+    label_path = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path) as labels:
+        return np.array(sorted(float(line) for line in labels if line.strip()), dtype=np.float64)
+
+def sweep_session(path, thresholds, gains, tolerance=0.5, min_duration=0.1):
+    """
+    Worker of the process pool: counts the jumps and false triggers of one session for every (threshold, gain).
+    The player is simulated the way Player does it: a jump sets gravity to the jump force, gravity grows by one
+    every tick, so the player is in the air for about 2 * |force| ticks and can't jump again before landing.
+    Returns (path, seconds, jumps, false_triggers, labels) with the counts as arrays of shape (thresholds, gains).
+    """
+    envelope, onset_levels = session_ticks(path, thresholds)
+    labels = load_labels(path)
+    threshold = np.array(thresholds, dtype=np.float32)[:, None]
+    gain = np.array(gains, dtype=np.float32)[None, :]
+    shape = (threshold.shape[0], gain.shape[1])
+    lowest_threshold = threshold.min()
+
+    ## Number of ticks from every tick that the envelope stays above each threshold
+    above = envelope[None, :] > threshold
+    run_length = np.zeros(above.shape, dtype=np.int32)
+    for tick in range(envelope.shape[0] - 1, -1, -1):
+        following = run_length[:, tick + 1] if tick + 1 < envelope.shape[0] else 0
+        run_length[:, tick] = np.where(above[:, tick], following + 1, 0)
+    min_ticks = max(1, int(round(min_duration * TICK_RATE)))
+
+    airborne = np.zeros(shape, dtype=np.int32)
+    jumps = np.zeros(shape, dtype=np.int32)
+    false_triggers = np.zeros(shape, dtype=np.int32)
+    for tick in range(envelope.shape[0]):
+        if envelope[tick] <= lowest_threshold and not onset_levels[:, tick].any() and not airborne.any():
+            continue
+        level = np.maximum(envelope[tick], onset_levels[:, tick])[:, None]
+        force = scream_jump_force(level, threshold, gain)  # The whole grid at once
+        jumped = (force != 0) & (airborne == 0)
+        airborne = np.where(jumped, np.ceil(-2 * force).astype(np.int32), np.maximum(airborne - 1, 0))
+        if not jumped.any():
+            continue
+        jumps += jumped
+
+        if labels is not None:
+            seconds = (tick + 1) / TICK_RATE
+            first = np.searchsorted(labels, seconds - tolerance)
+            is_false = first >= len(labels) or labels[first] > seconds
+        else:
+            is_false = (run_length[:, tick] < min_ticks)[:, None]
+        false_triggers += jumped & is_false
+
+    return path, len(envelope) / TICK_RATE, jumps, false_triggers, labels
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep the scream detection parameters over recorded sessions.")
+    parser.add_argument("folder", help="folder with the recorded session WAV files")
+    parser.add_argument("--thresholds", default="300:900:100", help="start:stop:step or a comma list")
+    parser.add_argument("--gains", default="150,250,400", help="start:stop:step or a comma list")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="seconds a jump may come after a labeled scream")
+    parser.add_argument("--min-duration", type=float, default=0.1,
+                        help="seconds above the threshold to count as a scream when there are no labels")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, default is every core")
+    parser.add_argument("--csv", help="also write the results to this CSV file")
+    args = parser.parse_args()
+
+    thresholds = parse_grid(args.thresholds)
+    gains = parse_grid(args.gains)
+    paths = sorted(glob.glob(os.path.join(args.folder, "*.wav")))
+    if not paths:
+        sys.exit(f"No WAV files in {args.folder}")
+
+    shape = (len(thresholds), len(gains))
+    total_jumps = np.zeros(shape, dtype=np.int64)
+    total_false = np.zeros(shape, dtype=np.int64)
+    total_seconds = 0.0
+    labeled_screams = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(sweep_session, path, thresholds, gains, args.tolerance, args.min_duration)
+                   for path in paths]
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            path, seconds, jumps, false_triggers, labels = future.result()
+            total_jumps += jumps
+            total_false += false_triggers
+            total_seconds += seconds
+            if labels is not None:
+                labeled_screams += len(labels)
+            print(f"[{done}/{len(paths)}] {os.path.basename(path)}", file=sys.stderr)
+
+    rows = []
+    for i, threshold in enumerate(thresholds):
+        for j, gain in enumerate(gains):
+            jumps = int(total_jumps[i, j])
+            false_triggers = int(total_false[i, j])
+            rows.append({
+                "threshold": threshold,
+                "gain": gain,
+                "jumps": jumps,
+                "jumps_per_minute": jumps / total_seconds * 60 if total_seconds else 0.0,
+                "false_triggers": false_triggers,
+                "false_trigger_rate": false_triggers / jumps if jumps else 0.0,
+            })
+
+    print(f"{len(paths)} sessions, {total_seconds / 60:.1f} minutes, {labeled_screams} labeled screams")
+    print(f"{'threshold':>10} {'gain':>8} {'jumps':>8} {'jumps/min':>10} {'false':>8} {'false rate':>11}")
+    for row in rows:
+        print(f"{row['threshold']:>10.0f} {row['gain']:>8.0f} {row['jumps']:>8} {row['jumps_per_minute']:>10.2f} "
+              f"{row['false_triggers']:>8} {row['false_trigger_rate']:>11.1%}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as output:
+            writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import bisect
+
+class IntervalIndex:
+    """
+    Broad phase index over the level geometry, sorted by the left edge in world x.
+    A query only looks at the items whose left edge is within the widest item of the query rect, found with bisect,
+    so the cost of a collision or a draw query stays flat however long the level is.
+    items: iterable, default=() - The items to index.
+    key: callable, default=None - Returns the pygame.Rect of an item, None when the items are rects themselves.
+    """
+    def __init__(self, items=(), key=None):
+        self.key = key if key is not None else (lambda item: item)
+        self.lefts = []
+        self.items = []
+        self.max_width = 0
+        for item in items:
+            self.insert(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def insert(self, item):
+        """
+        Adds an item. Its rect must not move in x while it is in the index.
+        """
+        rect = self.key(item)
+        position = bisect.bisect_right(self.lefts, rect.left)
+        self.lefts.insert(position, rect.left)
+        self.items.insert(position, item)
+        self.max_width = max(self.max_width, rect.width)
+
+    def remove(self, item):
+        """
+        Removes an item that was inserted before.
+        """
+        left = self.key(item).left
+        position = bisect.bisect_left(self.lefts, left)
+        while self.items[position] is not item:
+            position += 1
+        del self.lefts[position]
+        del self.items[position]
+
+    def query(self, rect):
+        """
+        Returns the items that overlap rect in x, ordered by their left edge. Use colliderect for the exact test.
+        """
+        start = bisect.bisect_right(self.lefts, rect.left - self.max_width)
+        end = bisect.bisect_left(self.lefts, rect.right)
+        return [item for item in self.items[start:end] if self.key(item).right > rect.left]
@@ -1,5 +1,6 @@
 import pygame
 import time
+from Assets import get_image
 
 class Block(pygame.sprite.Sprite):
     """
@@ -8,12 +9,20 @@ class Block(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
         self.images = [
-            pygame.image.load("Model/piranha_frame_1.png").convert_alpha(),
-            pygame.image.load("Model/piranha_frame_2.png").convert_alpha()
+            get_image("piranha_frame_1.png"),
+            get_image("piranha_frame_2.png")
         ]
         self.image = self.images[0]
         self.rect = self.image.get_rect(midbottom=(x, y))
         self.index = 0
+
+    def reset(self, x, y):
+        """
+        Puts a recycled block at a new position with its animation from the start.
+        """
+        self.index = 0
+        self.image = self.images[0]
+        self.rect.midbottom = (x, y)
     
     def update(self):
         self.index += 0.1
@@ -39,11 +48,11 @@ class Player(pygame.sprite.Sprite):
     def __init__(self):
         super().__init__()
         self.player_walk = [
-            pygame.image.load('Model/Mario - Walk1.gif').convert_alpha(),
-            pygame.image.load('Model/Mario - Walk2.gif').convert_alpha(),
-            pygame.image.load('Model/Mario - Walk3.gif').convert_alpha()
+            get_image('Mario - Walk1.gif'),
+            get_image('Mario - Walk2.gif'),
+            get_image('Mario - Walk3.gif')
         ]
-        self.player_jump = pygame.image.load("Model/Mario - Jump.gif").convert_alpha()
+        self.player_jump = get_image("Mario - Jump.gif")
         self.image = self.player_walk[0]
         self.rect = self.image.get_rect(midbottom=(100, 350))
         self.gravity = 0
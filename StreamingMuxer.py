@@ -0,0 +1,89 @@
+import socket
+import subprocess
+import threading
+import queue
+import imageio_ffmpeg
+
+class StreamingMuxer:
+    """
+    Class to record the game straight into the final file with one ffmpeg process while the game is running.
+    The raw BGR frames go to ffmpeg through stdin and the PCM audio through a local socket, so when the game exits
+    the final file is already there and there is no second decode / encode pass like the old moviepy step.
+    It has the same write(frame) / release() calls as cv2.VideoWriter, so it can be put behind the VideoEncoder.
+    filename: str, default="output/final_output.avi" - The name of the final audio + video file.
+    size: tuple, default=(640, 480) - The size of the video frames.
+    fps: int, default=15 - The frame rate of the video.
+    rate: int, default=44100 - The sampling rate of the audio.
+    channels: int, default=1 - The number of audio channels.
+    video_codec: str, default="libx264" - The ffmpeg video encoder.
+    audio_codec: str, default="aac" - The ffmpeg audio encoder.
+    """
+    def __init__(self, filename="output/final_output.avi", size=(640, 480), fps=15, rate=44100, channels=1,
+                 video_codec="libx264", audio_codec="aac"):
+        self.filename = filename
+        self.audio_queue = queue.Queue()
+        self.audio_ended = False
+
+        ## ffmpeg connects to us for the audio, so the port is known before the process is started
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        port = self.server.getsockname()[1]
+
+        command = [
+            imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-nostdin", "-loglevel", "error",
+            "-f", "rawvideo", "-probesize", "32", "-analyzeduration", "0", "-pix_fmt", "bgr24", "-video_size", f"{size[0]}x{size[1]}", "-framerate", str(fps),
+            "-i", "pipe:0",
+            ## Both inputs are raw with known parameters, so don't let ffmpeg wait on probing them
+            "-f", "s16le", "-ar", str(rate), "-ac", str(channels), "-probesize", "32", "-analyzeduration", "0",
+            "-i", f"tcp://127.0.0.1:{port}",
+            "-c:v", video_codec, "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", audio_codec,
+            filename,
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.audio_thread = threading.Thread(target=self.send_audio, daemon=True)
+        self.audio_thread.start()
+
+    def write(self, frame):
+        """
+        Sends one BGR frame to ffmpeg. This blocks while ffmpeg is busy, so call it from the encoder thread.
+        """
+        self.process.stdin.write(memoryview(frame).cast("B"))
+
+    def write_audio(self, data):
+        """
+        Queues a PCM buffer for ffmpeg. Safe to call from the audio thread, it never blocks.
+        """
+        self.audio_queue.put(data)
+
+    def end_audio(self):
+        """
+        Tells ffmpeg there is no more audio. Call it once the recorder is stopped, so ffmpeg doesn't wait
+        on the audio stream while the last video frames are still being written.
+        """
+        if not self.audio_ended:
+            self.audio_ended = True
+            self.audio_queue.put(None)
+
+    def send_audio(self):
+        """
+        Background thread that waits for ffmpeg to connect and then forwards the queued PCM buffers.
+        """
+        connection, _ = self.server.accept()
+        with connection:
+            while True:
+                data = self.audio_queue.get()
+                if data is None:
+                    break
+                connection.sendall(data)
+        self.server.close()
+
+    def release(self):
+        """
+        Closes both streams and waits for ffmpeg to finish writing the file.
+        """
+        self.process.stdin.close()
+        self.end_audio()
+        self.audio_thread.join()
+        self.process.wait()
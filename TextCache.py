@@ -0,0 +1,40 @@
+import collections
+import pygame
+
+class TextCache:
+    """
+    Class to render text without building a new Font and Surface every frame.
+    Every font size is created once, and rendered surfaces are kept by (text, size, color) with LRU eviction.
+    max_surfaces: int, default=128 - The number of rendered surfaces kept before the least recently used is dropped.
+    font_name: str, default=None - The font file, None is the pygame default font.
+    """
+    def __init__(self, max_surfaces=128, font_name=None):
+        self.max_surfaces = max_surfaces
+        self.font_name = font_name
+        self.fonts = {}
+        self.surfaces = collections.OrderedDict()
+
+    def font(self, size):
+        """
+        Returns the font of the given size, created on the first call.
+        """
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(self.font_name, size)
+        return font
+
+    def render(self, text, size, color):
+        """
+        Returns the rendered (antialiased) text surface, from the cache when it was rendered before.
+        """
+        key = (text, size, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
@@ -0,0 +1,129 @@
+import threading
+import collections
+import numpy as np
+
+class VideoEncoder(threading.Thread):
+    """
+    Separate thread for encoding the recorded frames, so the XVID encode never adds to the frame time of the game.
+    The game thread fills reusable frame buffers and hands them to a bounded queue, the worker writes them to the writer.
+    writer: object - Anything with write(frame) and release(), usually a cv2.VideoWriter.
+    frame_shape: tuple, default=(480, 640, 3) - The shape of the BGR frames that will be written.
+    queue_size: int, default=4 - The number of reusable frame buffers, at most this many frames are waiting or being encoded.
+    policy: str, default="drop_oldest" - What to do when the queue is full:
+        "drop_oldest" reuses the oldest waiting frame, "drop_newest" skips the new frame, "block" waits for the worker.
+    repeat_dropped: bool, default=False - Writes the frame before a dropped one again in its place. A writer with a
+        fixed frame rate like StreamingMuxer then keeps one frame per game frame and the video stays as long as the audio.
+    """
+    POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, writer, frame_shape=(480, 640, 3), queue_size=4, policy="drop_oldest", repeat_dropped=False):
+        super(VideoEncoder, self).__init__(daemon=True)
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.writer = writer
+        self.queue_size = queue_size
+        self.policy = policy
+        self.repeat_dropped = repeat_dropped
+        self.running = False
+
+        self.free_buffers = [np.empty(frame_shape, dtype=np.uint8) for _ in range(queue_size)]
+        self.pending = collections.deque()
+        self.condition = threading.Condition()
+
+        self.submitted_frames = 0
+        self.written_frames = 0
+        self.dropped_frames = 0
+        self.repeated_frames = 0
+        self.owed_repeats = 0  # Dropped frames not filled in yet
+        self.max_depth = 0
+
+    def start(self):
+        """
+        Starts the worker, running is set here so frames can be queued before the thread is scheduled.
+        """
+        self.running = True
+        super(VideoEncoder, self).start()
+
+    def acquire(self):
+        """
+        Returns a free frame buffer for the game thread to fill, or None when the frame should be skipped.
+        """
+        with self.condition:
+            if not self.free_buffers and self.policy == "block":
+                self.condition.wait_for(lambda: self.free_buffers or not self.running)
+            if self.free_buffers:
+                return self.free_buffers.pop()
+            self.dropped_frames += 1
+            if self.repeat_dropped:
+                self.owed_repeats += 1
+            if self.policy == "drop_oldest" and self.pending:
+                return self.pending.popleft()
+            return None
+
+    def submit(self, buffer):
+        """
+        Queues a buffer returned by acquire() for encoding.
+        """
+        with self.condition:
+            self.pending.append(buffer)
+            self.submitted_frames += 1
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.condition.notify_all()
+
+    def write(self, frame):
+        """
+        Same call as cv2.VideoWriter.write, the frame is copied into a pool buffer and queued.
+        """
+        buffer = self.acquire()
+        if buffer is not None:
+            np.copyto(buffer, frame)
+            self.submit(buffer)
+
+    def run(self):
+        """
+        Background thread that writes the queued frames in order and gives the buffers back to the pool.
+        The frames dropped while a buffer was written are filled in with that buffer, the frame right before them.
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running)
+                if not self.pending:
+                    break
+                buffer = self.pending.popleft()
+
+            self.writer.write(buffer)
+            with self.condition:
+                repeats, self.owed_repeats = self.owed_repeats, 0
+            for _ in range(repeats):
+                self.writer.write(buffer)
+
+            with self.condition:
+                self.written_frames += 1 + repeats
+                self.repeated_frames += repeats
+                self.free_buffers.append(buffer)
+                self.condition.notify_all()
+
+    def stats(self):
+        """
+        Returns the queue depth and the frame counters as a dictionary.
+        """
+        with self.condition:
+            return {
+                "depth": len(self.pending),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted_frames,
+                "written": self.written_frames,
+                "dropped": self.dropped_frames,
+                "repeated": self.repeated_frames,
+            }
+
+    def release(self):
+        """
+        Encodes the frames still in the queue, stops the worker and releases the writer.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.is_alive():
+            self.join()
+        self.writer.release()
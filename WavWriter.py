@@ -0,0 +1,59 @@
+import threading
+import queue
+import time
+import wave
+
+class WavStreamWriter(threading.Thread):
+    """
+    Separate thread that writes the PCM to the WAV file while it is being recorded.
+    The audio thread only puts the buffers in a queue, the writer appends them to the file, so the recording
+    is not kept in memory and most of it survives a crash. The header is fixed up now and then, and on close.
+    filename: str - The name of the WAV file.
+    rate: int, default=44100 - The sampling rate of the audio.
+    channels: int, default=1 - The number of audio channels.
+    sample_width: int, default=2 - The number of bytes per sample, 2 for paInt16.
+    header_interval: float, default=1.0 - Seconds between header updates while recording.
+    """
+    def __init__(self, filename, rate=44100, channels=1, sample_width=2, header_interval=1.0):
+        super(WavStreamWriter, self).__init__(daemon=True)
+        self.filename = filename
+        self.rate = rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.header_interval = header_interval
+        self.queue = queue.SimpleQueue()
+        self.written_frames = 0
+
+    def write(self, data):
+        """
+        Queues a PCM buffer for the file. Never blocks, safe to call from the audio callback.
+        """
+        self.queue.put(data)
+
+    def run(self):
+        """
+        Background thread that appends the queued buffers to the file until close() is called.
+        writeframesraw doesn't touch the header, writeframes(b"") is used to update it every header_interval.
+        """
+        with wave.open(self.filename, 'wb') as wavefile:
+            wavefile.setnchannels(self.channels)
+            wavefile.setsampwidth(self.sample_width)
+            wavefile.setframerate(self.rate)
+            last_header = time.monotonic()
+            while True:
+                data = self.queue.get()
+                if data is None:
+                    break
+                wavefile.writeframesraw(data)
+                self.written_frames += len(data) // (self.sample_width * self.channels)
+                if time.monotonic() - last_header > self.header_interval:
+                    wavefile.writeframes(b"")
+                    last_header = time.monotonic()
+
+    def close(self):
+        """
+        Writes what is left in the queue, fixes the header and closes the file.
+        """
+        self.queue.put(None)
+        if self.is_alive():
+            self.join()